@@ -0,0 +1,120 @@
+"""去重存储后端基准测试
+
+用同一组模拟消息依次测试 memory、sqlite、sharded 三种后端，报告吞吐量、
+单次查重延迟分位数以及结束时的索引和写入队列状态。
+
+用法（在 AstrBot 根目录下执行，需要能导入 astrbot）:
+    python data/plugins/<插件目录>/benchmarks/dedup_storage.py --messages 20000
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+plugin = os.path.basename(PLUGIN_DIR)
+models = importlib.import_module(f"{plugin}.models")
+fingerprint = importlib.import_module(f"{plugin}.utils.fingerprint")
+
+
+def build_workload(messages: int, groups: int, users: int, duplicate_ratio: float):
+    """生成 (group_id, user_id, 指纹) 序列，按比例重复发送之前的内容"""
+    rng = random.Random(42)
+    sent = []
+    workload = []
+    for index in range(messages):
+        if sent and rng.random() < duplicate_ratio:
+            workload.append(rng.choice(sent))
+            continue
+        item = (
+            rng.randrange(groups) + 1,
+            rng.randrange(users) + 1,
+            fingerprint.compute_fingerprint(f"message:{index}"),
+        )
+        sent.append(item)
+        workload.append(item)
+    return workload
+
+
+def create_backend(name: str, workdir: str, index_max_entries: int):
+    if name == "memory":
+        return models.MemoryMessageRecord(index_max_entries=index_max_entries)
+    if name == "sqlite":
+        return models.MessageRecord(
+            db_path=os.path.join(workdir, "message_records.db"),
+            index_max_entries=index_max_entries,
+        )
+    return models.ShardedMessageRecord(
+        db_dir=os.path.join(workdir, "shards"), index_max_entries=index_max_entries
+    )
+
+
+async def run_backend(name: str, workload: list, index_max_entries: int) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        record = create_backend(name, workdir, index_max_entries)
+        await record.init_db()
+        latencies = []
+        duplicates = 0
+        start = time.perf_counter()
+        for group_id, user_id, digest in workload:
+            begin = time.perf_counter()
+            if await record.check_and_record(group_id, user_id, digest, "text"):
+                duplicates += 1
+            latencies.append(time.perf_counter() - begin)
+        elapsed = time.perf_counter() - start
+        stats = record.get_stats()
+        await record.close()
+
+    latencies.sort()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1e6
+
+    return {
+        "backend": name,
+        "ops": len(workload) / elapsed,
+        "p50": percentile(0.5),
+        "p99": percentile(0.99),
+        "duplicates": duplicates,
+        "index_size": stats.get("index_size", 0),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="去重存储后端基准测试")
+    parser.add_argument("--messages", type=int, default=20000, help="消息数量")
+    parser.add_argument("--groups", type=int, default=20, help="群数量")
+    parser.add_argument("--users", type=int, default=500, help="每群用户数量")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="重复比例")
+    parser.add_argument(
+        "--index-max-entries", type=int, default=100000, help="内存索引容量"
+    )
+    parser.add_argument(
+        "--backends",
+        nargs="+",
+        default=["memory", "sqlite", "sharded"],
+        choices=["memory", "sqlite", "sharded"],
+    )
+    args = parser.parse_args()
+
+    workload = build_workload(
+        args.messages, args.groups, args.users, args.duplicate_ratio
+    )
+    print(f"消息 {len(workload)} 条，群 {args.groups} 个，重复比例 {args.duplicate_ratio}")
+    print("后端      吞吐量(条/秒)  p50(微秒)  p99(微秒)  命中重复  索引大小")
+    for name in args.backends:
+        result = await run_backend(name, workload, args.index_max_entries)
+        print(
+            f"{result['backend']:<10}{result['ops']:<15.0f}{result['p50']:<11.1f}"
+            f"{result['p99']:<11.1f}{result['duplicates']:<10}{result['index_size']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
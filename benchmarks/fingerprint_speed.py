@@ -0,0 +1,78 @@
+"""内容指纹算法基准测试
+
+在不同长度的消息上对比 SHA-256 十六进制摘要、compute_fingerprint
+（SHA-256 截断为 128 位）与带密钥的 128 位 BLAKE2b，报告单次调用耗时。
+
+用法（在插件目录的上一级目录下执行，不需要 astrbot）:
+    python <插件目录>/benchmarks/fingerprint_speed.py
+"""
+
+import argparse
+import hashlib
+import importlib
+import os
+import sys
+import timeit
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+plugin = os.path.basename(PLUGIN_DIR)
+fingerprint = importlib.import_module(f"{plugin}.utils.fingerprint")
+
+BLAKE2_KEY = b"banshi_administrator"
+
+
+def sha256_hex(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def blake2b_keyed(content: str) -> bytes:
+    return hashlib.blake2b(
+        content.encode("utf-8"), digest_size=16, key=BLAKE2_KEY
+    ).digest()
+
+
+ALGORITHMS = {
+    "sha256 hexdigest": sha256_hex,
+    "compute_fingerprint": fingerprint.compute_fingerprint,
+    "blake2b-128 keyed": blake2b_keyed,
+}
+
+
+def make_message(size: int) -> str:
+    """生成约 size 字节的中英文混合消息"""
+    unit = "今天搬史了吗 repost "
+    unit_bytes = len(unit.encode("utf-8"))
+    return unit * max(1, size // unit_bytes)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="内容指纹算法基准测试")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[40, 400, 4000, 40000],
+        help="消息长度（字节）",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="重复测量次数")
+    args = parser.parse_args()
+
+    messages = [make_message(size) for size in args.sizes]
+    header = "".join(f"{size:>10}B" for size in args.sizes)
+    print(f"{'算法':<20}{header}  (微秒/次)")
+    for name, func in ALGORITHMS.items():
+        row = []
+        for message in messages:
+            number = max(100, 2_000_000 // max(1, len(message)))
+            best = min(
+                timeit.repeat(
+                    lambda: func(message), number=number, repeat=args.repeat
+                )
+            )
+            row.append(best / number * 1e6)
+        print(f"{name:<22}" + "".join(f"{value:>11.2f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""广告关键词匹配基准测试
+
+生成一个不含广告的大型转发消息（每个节点一段文本和一张 json 卡片），
+对比原先逐个关键词做子串查找与 KeywordMatcher 的完整扫描耗时。
+关键词数量超过 REGEX_PATTERN_LIMIT 时 KeywordMatcher 改用 Aho-Corasick 自动机。
+
+用法（在插件目录的上一级目录下执行，不需要 astrbot）:
+    python <插件目录>/benchmarks/keyword_matcher.py --nodes 5000
+"""
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+import time
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+plugin = os.path.basename(PLUGIN_DIR)
+constants = importlib.import_module(f"{plugin}.utils.constants")
+keyword_matcher = importlib.import_module(f"{plugin}.utils.keyword_matcher")
+
+TEXT_WORDS = ["今天", "搬史", "哈哈哈", "转发", "图片", "repost", "meme", "好耶"]
+
+
+def build_messages(nodes: int) -> list:
+    """生成转发消息节点，结构与 get_forward_msg 的返回一致"""
+    rng = random.Random(42)
+    messages = []
+    for index in range(nodes):
+        text = " ".join(rng.choice(TEXT_WORDS) for _ in range(20))
+        card = json.dumps(
+            {"app": "com.tencent.miniapp", "prompt": f"分享{index}", "ver": "1.0"}
+        )
+        messages.append(
+            {
+                "message": [
+                    {"type": "text", "data": {"text": text}},
+                    {"type": "json", "data": {"data": card}},
+                ]
+            }
+        )
+    return messages
+
+
+def extra_keywords(count: int) -> list:
+    """生成不会出现在消息中的额外关键词"""
+    rng = random.Random(7)
+    return [
+        "".join(chr(rng.randrange(0x4E00, 0x9FA5)) for _ in range(4))
+        for _ in range(count)
+    ]
+
+
+def substring_scan(messages: list, keywords: list, indicators: list) -> bool:
+    """原先的实现：每个文本逐个关键词查找"""
+    for msg in messages:
+        for part in msg["message"]:
+            if part["type"] == "text":
+                text = part["data"].get("text", "").lower()
+                if any(keyword in text for keyword in keywords):
+                    return True
+            elif part["type"] == "json":
+                data = part["data"].get("data", "").lower()
+                if any(indicator.lower() in data for indicator in indicators):
+                    return True
+    return False
+
+
+def matcher_scan(messages: list, keywords, indicators) -> bool:
+    """当前实现：预先构建的 KeywordMatcher 单次扫描"""
+    for msg in messages:
+        for part in msg["message"]:
+            if part["type"] == "text":
+                if keywords.search(part["data"].get("text", "")):
+                    return True
+            elif part["type"] == "json":
+                if indicators.search(part["data"].get("data", "")):
+                    return True
+    return False
+
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="广告关键词匹配基准测试")
+    parser.add_argument("--nodes", type=int, default=5000, help="转发节点数量")
+    parser.add_argument(
+        "--extra",
+        type=int,
+        nargs="+",
+        default=[0, 50, 550],
+        help="在默认关键词之外追加的关键词数量",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="重复测量次数")
+    args = parser.parse_args()
+
+    messages = build_messages(args.nodes)
+    indicators = list(constants.AD_CARD_INDICATORS)
+    print(f"转发节点 {len(messages)} 个，全部不含广告")
+    print("关键词数  逐个查找(毫秒)  KeywordMatcher(毫秒)")
+    for extra in args.extra:
+        keywords = list(constants.AD_KEYWORDS) + extra_keywords(extra)
+        keyword_set = keyword_matcher.KeywordMatcher(keywords)
+        indicator_set = keyword_matcher.KeywordMatcher(indicators)
+        if substring_scan(messages, keywords, indicators) or matcher_scan(
+            messages, keyword_set, indicator_set
+        ):
+            print(f"{len(keywords)} 个关键词意外命中，跳过")
+            continue
+        before = best_time(
+            lambda: substring_scan(messages, keywords, indicators), args.repeat
+        )
+        after = best_time(
+            lambda: matcher_scan(messages, keyword_set, indicator_set), args.repeat
+        )
+        print(f"{len(keywords):<10}{before * 1000:<16.1f}{after * 1000:.1f}")
+
+
+if __name__ == "__main__":
+    main()
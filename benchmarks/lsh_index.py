@@ -0,0 +1,82 @@
+"""SimHash LSH 索引基准测试
+
+向 SimHashIndex 写入随机签名，报告构建耗时；再对已有签名翻转若干位后查询，
+报告单次查询耗时和召回率，以及计算一条消息签名的耗时。
+
+用法（在 AstrBot 根目录下执行，需要能导入 astrbot）:
+    python data/plugins/<插件目录>/benchmarks/lsh_index.py --signatures 1000000
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+plugin = os.path.basename(PLUGIN_DIR)
+lsh_index = importlib.import_module(f"{plugin}.models.lsh_index")
+simhash = importlib.import_module(f"{plugin}.utils.simhash")
+
+SAMPLE_MESSAGE = "今天的史已经搬完了，大家不要再转发这条消息了！！"
+
+
+def flip_bits(rng: random.Random, signature: int, count: int) -> int:
+    for bit in rng.sample(range(simhash.SIMHASH_BITS), count):
+        signature ^= 1 << bit
+    return signature
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="SimHash LSH 索引基准测试")
+    parser.add_argument("--signatures", type=int, default=1000000, help="签名数量")
+    parser.add_argument("--queries", type=int, default=10000, help="查询次数")
+    parser.add_argument("--max-distance", type=int, default=3, help="最大汉明距离")
+    parser.add_argument("--flip", type=int, default=2, help="查询前翻转的位数")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    signatures = [rng.getrandbits(simhash.SIMHASH_BITS) for _ in range(args.signatures)]
+    index = lsh_index.SimHashIndex(
+        86400, args.max_distance, max_entries=args.signatures
+    )
+    now = time.time()
+
+    start = time.perf_counter()
+    for signature in signatures:
+        index.add(signature, now)
+    build = time.perf_counter() - start
+    print(
+        f"构建 {len(index)} 个签名: {build:.2f} 秒"
+        f"（{build / len(signatures) * 1e6:.2f} 微秒/个）"
+    )
+
+    queries = [
+        flip_bits(rng, rng.choice(signatures), min(args.flip, args.max_distance))
+        for _ in range(args.queries)
+    ]
+    found = 0
+    start = time.perf_counter()
+    for query in queries:
+        if index.query(query, now) is not None:
+            found += 1
+    elapsed = time.perf_counter() - start
+    print(
+        f"查询 {len(queries)} 次（翻转 {args.flip} 位，最大距离 {args.max_distance}）: "
+        f"{elapsed / len(queries) * 1e6:.1f} 微秒/次，召回率 {found / len(queries):.2%}"
+    )
+
+    rounds = 10000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        simhash.simhash(SAMPLE_MESSAGE)
+    elapsed = time.perf_counter() - start
+    print(
+        f"计算 {len(SAMPLE_MESSAGE)} 字消息的签名: {elapsed / rounds * 1e6:.1f} 微秒/次"
+    )
+
+
+if __name__ == "__main__":
+    main()
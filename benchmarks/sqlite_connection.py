@@ -0,0 +1,123 @@
+"""SQLite 连接方式基准测试
+
+对比每次操作新建连接（默认 DELETE 日志模式）与 MessageRecord 的 WAL 长连接。
+每条消息执行一次查重 SELECT 和一次 INSERT + commit，报告每秒处理的消息数。
+
+用法（在 AstrBot 根目录下执行，需要能导入 astrbot）:
+    python data/plugins/<插件目录>/benchmarks/sqlite_connection.py --messages 2000
+"""
+
+import argparse
+import asyncio
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+import aiosqlite
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+plugin = os.path.basename(PLUGIN_DIR)
+models = importlib.import_module(f"{plugin}.models")
+fingerprint = importlib.import_module(f"{plugin}.utils.fingerprint")
+
+CREATE_SQL = """
+    CREATE TABLE IF NOT EXISTS message_records (
+        group_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        fingerprint BLOB NOT NULL,
+        created_at INTEGER NOT NULL,
+        message_type TEXT NOT NULL,
+        PRIMARY KEY (group_id, user_id, fingerprint)
+    ) WITHOUT ROWID
+"""
+SELECT_SQL = """
+    SELECT created_at FROM message_records
+    WHERE group_id = ? AND user_id = ? AND fingerprint = ? AND created_at > ?
+"""
+INSERT_SQL = """
+    INSERT OR REPLACE INTO message_records
+    (group_id, user_id, fingerprint, created_at, message_type)
+    VALUES (?, ?, ?, ?, 'text')
+"""
+
+
+def build_workload(messages: int, groups: int, users: int):
+    """生成 (group_id, user_id, 指纹) 序列"""
+    rng = random.Random(42)
+    return [
+        (
+            rng.randrange(groups) + 1,
+            rng.randrange(users) + 1,
+            fingerprint.compute_fingerprint(f"message:{index}"),
+        )
+        for index in range(messages)
+    ]
+
+
+async def run_per_call(db_path: str, workload: list) -> float:
+    """每次查询和写入都新建连接"""
+    async with aiosqlite.connect(db_path) as db:
+        await db.execute(CREATE_SQL)
+        await db.commit()
+
+    start = time.perf_counter()
+    for group_id, user_id, digest in workload:
+        now = int(time.time())
+        async with aiosqlite.connect(db_path) as db:
+            async with db.execute(
+                SELECT_SQL, (group_id, user_id, digest, now - 86400)
+            ) as cursor:
+                if await cursor.fetchone():
+                    continue
+        async with aiosqlite.connect(db_path) as db:
+            await db.execute(INSERT_SQL, (group_id, user_id, digest, now))
+            await db.commit()
+    return time.perf_counter() - start
+
+
+async def run_persistent(db_path: str, workload: list) -> float:
+    """复用一个按 MessageRecord.PRAGMAS 配置的 WAL 长连接"""
+    db = await aiosqlite.connect(db_path)
+    try:
+        for pragma in models.MessageRecord.PRAGMAS:
+            await db.execute(pragma)
+        await db.execute(CREATE_SQL)
+        await db.commit()
+
+        start = time.perf_counter()
+        for group_id, user_id, digest in workload:
+            now = int(time.time())
+            async with db.execute(
+                SELECT_SQL, (group_id, user_id, digest, now - 86400)
+            ) as cursor:
+                if await cursor.fetchone():
+                    continue
+            await db.execute(INSERT_SQL, (group_id, user_id, digest, now))
+            await db.commit()
+        return time.perf_counter() - start
+    finally:
+        await db.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="SQLite 连接方式基准测试")
+    parser.add_argument("--messages", type=int, default=2000, help="消息数量")
+    parser.add_argument("--groups", type=int, default=20, help="群数量")
+    parser.add_argument("--users", type=int, default=500, help="每群用户数量")
+    args = parser.parse_args()
+
+    workload = build_workload(args.messages, args.groups, args.users)
+    print(f"消息 {len(workload)} 条")
+    print("连接方式        耗时(秒)  吞吐量(条/秒)")
+    for name, runner in (("每次新建连接", run_per_call), ("WAL 长连接", run_persistent)):
+        with tempfile.TemporaryDirectory() as workdir:
+            elapsed = await runner(os.path.join(workdir, "bench.db"), workload)
+        print(f"{name:<12}{elapsed:<10.2f}{len(workload) / elapsed:.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""流式指纹基准测试
+
+模拟一个大型转发消息，对比先用 "|" 拼接全部节点再计算指纹，与用
+StreamingFingerprint 逐个写入节点的峰值内存和耗时。两种方式的指纹相同。
+
+用法（在插件目录的上一级目录下执行，不需要 astrbot）:
+    python <插件目录>/benchmarks/streaming_fingerprint.py --nodes 500
+"""
+
+import argparse
+import importlib
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+plugin = os.path.basename(PLUGIN_DIR)
+fingerprint = importlib.import_module(f"{plugin}.utils.fingerprint")
+
+
+def build_nodes(nodes: int, node_bytes: int) -> list:
+    """生成转发消息各节点的文本"""
+    rng = random.Random(42)
+    words = ["搬史", "今天", "转发", "repost", "meme", "群友", "哈哈哈", "2024"]
+    result = []
+    for _ in range(nodes):
+        parts = []
+        size = 0
+        while size < node_bytes:
+            word = rng.choice(words)
+            parts.append(word)
+            size += len(word.encode("utf-8")) + 1
+        result.append(" ".join(parts))
+    return result
+
+
+def joined(nodes: list) -> bytes:
+    return fingerprint.compute_fingerprint("|".join(nodes))
+
+
+def streaming(nodes: list) -> bytes:
+    digest = fingerprint.StreamingFingerprint(separator="|")
+    for node in nodes:
+        digest.update(node)
+    return digest.digest()
+
+
+def measure(func, nodes: list, repeat: int):
+    """返回 (指纹, 峰值内存字节数, 最短耗时秒数)"""
+    tracemalloc.start()
+    result = func(nodes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(nodes)
+        best = min(best, time.perf_counter() - start)
+    return result, peak, best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="流式指纹基准测试")
+    parser.add_argument("--nodes", type=int, default=500, help="转发节点数量")
+    parser.add_argument("--node-bytes", type=int, default=6000, help="每个节点字节数")
+    parser.add_argument("--repeat", type=int, default=10, help="重复测量次数")
+    args = parser.parse_args()
+
+    nodes = build_nodes(args.nodes, args.node_bytes)
+    total = sum(len(node.encode("utf-8")) for node in nodes)
+    print(f"节点 {len(nodes)} 个，共 {total / 1024 / 1024:.1f} MiB")
+
+    digests = set()
+    print("方式        峰值内存(KiB)  耗时(毫秒)")
+    for name, func in (("joined", joined), ("streaming", streaming)):
+        digest, peak, elapsed = measure(func, nodes, args.repeat)
+        digests.add(digest)
+        print(f"{name:<12}{peak / 1024:<15.1f}{elapsed * 1000:.2f}")
+    print("指纹一致" if len(digests) == 1 else "指纹不一致")
+
+
+if __name__ == "__main__":
+    main()
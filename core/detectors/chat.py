@@ -1,22 +1,107 @@
-from typing import Optional
+import os
+import re
+from typing import Dict, List, Optional, Tuple
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 from .base import BaseDetector
-from ...utils.constants import BAN_DURATIONS, WARNING_RECALL_DELAY
+from ...models.llm_gate import LLMGate, LLMUnavailableError
+from ...models.micro_batcher import MicroBatcher
+from ...models.trust_store import TrustStore
+from ...models.verdict_cache import VerdictCache
+from ...utils.constants import (
+    BAN_DURATIONS,
+    WARNING_RECALL_DELAY,
+    LLM_VERDICT_CACHE_SIZE,
+    LLM_VERDICT_CACHE_TTL,
+    LLM_BATCH_SIZE,
+    LLM_BATCH_WAIT_MS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_PENDING,
+    LLM_TIMEOUT,
+    LLM_BREAKER_THRESHOLD,
+    LLM_BREAKER_COOLDOWN,
+    LOCAL_CLASSIFIER_CONFIDENCE,
+    LOCAL_CLASSIFIER_MIN_SAMPLES,
+    LOCAL_CLASSIFIER_MAX_SAMPLES,
+    LOCAL_CLASSIFIER_RETRAIN_INTERVAL,
+    TRUST_THRESHOLD,
+    TRUST_MIN_OBSERVATIONS,
+    TRUST_SAMPLE_RATE,
+    TRUST_MAX_OBSERVATIONS,
+    TRUST_CHAT_PENALTY,
+    TRUST_FLUSH_INTERVAL,
+)
 from ...utils.rules import AdminRules
+from ...utils.text_classifier import NaiveBayesClassifier
 import asyncio
 
 
 class ChatDetector(BaseDetector):
     """聊天内容检测器"""
 
+    # 批量判定响应中的一行，例如 "3. 转发文案"
+    BATCH_ANSWER_PATTERN = re.compile(r"^\s*(\d+)\s*[.、:：)）]\s*(.+?)\s*$", re.M)
+
     def __init__(self, administrator, config):
         super().__init__(administrator, config)
         self._warning_tasks = {}
 
+        # LLM 判定缓存，相同文本只调用一次 LLM
+        self.verdict_cache = VerdictCache(
+            LLM_VERDICT_CACHE_SIZE,
+            max(1, config.get("llm_verdict_cache_ttl_hours", LLM_VERDICT_CACHE_TTL))
+            * 3600,
+            persist=config.get("llm_verdict_cache_persist", True),
+        )
+
+        # 繁忙时把多条消息合并为一次 LLM 调用，每个 LLM 提供商一个批处理器
+        self.batch_size = config.get("llm_batch_size", LLM_BATCH_SIZE)
+        self.batch_wait_ms = config.get("llm_batch_wait_ms", LLM_BATCH_WAIT_MS)
+        self._batchers: Dict[int, Tuple[object, MicroBatcher]] = {}
+
+        # 限制并发、超时和熔断，LLM 不可用时直接放行消息
+        self.llm_gate = LLMGate(
+            config.get("llm_max_concurrency", LLM_MAX_CONCURRENCY),
+            config.get("llm_timeout_seconds", LLM_TIMEOUT),
+            config.get("llm_breaker_threshold", LLM_BREAKER_THRESHOLD),
+            config.get("llm_breaker_cooldown_seconds", LLM_BREAKER_COOLDOWN),
+            LLM_MAX_PENDING,
+        )
+
+        # 本地分类器用 LLM 的历史判定训练，有把握时不再调用 LLM
+        self.enable_local_classifier = config.get("enable_local_classifier", True)
+        self.local_classifier_confidence = config.get(
+            "local_classifier_confidence", LOCAL_CLASSIFIER_CONFIDENCE
+        )
+        self.local_classifier: Optional[NaiveBayesClassifier] = None
+        self._local_model_path: Optional[str] = None
+        self._retrain_task: Optional[asyncio.Task] = None
+        self._verdicts_since_train = 0
+        self._local_stats = {"hits": 0, "misses": 0}
+
+        # 长期只发转发文案的用户只抽查部分消息
+        self.trust_store: Optional[TrustStore] = None
+        if config.get("enable_trust_skip", True):
+            self.trust_store = TrustStore(
+                config.get("trust_threshold", TRUST_THRESHOLD),
+                config.get("trust_min_observations", TRUST_MIN_OBSERVATIONS),
+                config.get("trust_sample_rate", TRUST_SAMPLE_RATE),
+                TRUST_MAX_OBSERVATIONS,
+                TRUST_CHAT_PENALTY,
+                TRUST_FLUSH_INTERVAL,
+            )
+
     async def _init_impl(self) -> None:
         """初始化实现"""
-        pass
+        await self.verdict_cache.init()
+        if self.trust_store:
+            await self.trust_store.init()
+
+        if self.enable_local_classifier and self.verdict_cache.db_path:
+            self._local_model_path = os.path.join(
+                os.path.dirname(self.verdict_cache.db_path), "chat_classifier.json"
+            )
+            await self._load_local_classifier()
 
     async def _stop_impl(self) -> None:
         """停止实现"""
@@ -26,6 +111,46 @@ class ChatDetector(BaseDetector):
                 task.cancel()
         self._warning_tasks.clear()
 
+        if self._retrain_task and not self._retrain_task.done():
+            self._retrain_task.cancel()
+            try:
+                await self._retrain_task
+            except asyncio.CancelledError:
+                pass
+
+        # 处理完剩余的批量判定
+        for _, batcher in self._batchers.values():
+            await batcher.close()
+        self._batchers.clear()
+
+        await self.verdict_cache.close()
+        if self.trust_store:
+            await self.trust_store.close()
+
+    def get_stats(self) -> dict:
+        """获取用户信誉、本地分类器、LLM 判定缓存、批量判定和调用闸门的情况"""
+        batching = {"batches": 0, "items": 0}
+        for _, batcher in self._batchers.values():
+            stats = batcher.get_stats()
+            batching["batches"] += stats["batches"]
+            batching["items"] += stats["items"]
+        batching["avg_batch_size"] = round(
+            batching["items"] / batching["batches"] if batching["batches"] else 0.0, 2
+        )
+        return {
+            "trust": self.trust_store.get_stats() if self.trust_store else None,
+            "local_classifier": {
+                "trained": bool(self.local_classifier),
+                "samples": (
+                    self.local_classifier.sample_count if self.local_classifier else 0
+                ),
+                **self._local_stats,
+            },
+            "verdict_cache": self.verdict_cache.get_stats(),
+            "batching": batching,
+            "llm_gate": self.llm_gate.get_stats(),
+        }
+
     async def check(self, event: AstrMessageEvent) -> bool:
         """检查并处理聊天消息"""
         try:
@@ -67,22 +192,37 @@ class ChatDetector(BaseDetector):
             if len(message_text) < min_length:
                 return False
 
+            group_id = event.message_obj.group_id
+            user_id = event.message_obj.sender.user_id
+
             # 明显的聊天内容
             if self._is_obviously_chat(message_text):
+                if self.trust_store:
+                    self.trust_store.record(group_id, user_id, False)
                 return True
 
-            # 使用 LLM 进行判断
-            is_forward = await self._is_forward_content(event, message_text)
+            # 使用本地规则、本地分类器和 LLM 判断，无法判定时默认为转发文案
+            is_forward = await self._detect_forward_content(event, message_text)
+            if is_forward is None:
+                return False
+            if self.trust_store:
+                self.trust_store.record(group_id, user_id, is_forward)
             return not is_forward  # 如果不是转发文案，就是纯聊天
 
         except Exception as e:
             logger.error(f"判断聊天禁言时发生错误: {e}", exc_info=True)
             return False
 
-    async def _is_forward_content(
+    async def _detect_forward_content(
         self, event: AstrMessageEvent, message_text: str
-    ) -> bool:
-        """判断消息是否为转发文案"""
+    ) -> Optional[bool]:
+        """
+        判断消息是否为转发文案
+
+        Returns:
+            Optional[bool]: 判定结果，没有 LLM、LLM 判定失败或可信用户免于
+                LLM 判定时返回 None
+        """
         try:
             # 获取 LLM 提供商
             provider = self.administrator.context.get_using_provider(
@@ -91,21 +231,182 @@ class ChatDetector(BaseDetector):
 
             if not provider:
                 logger.warning("未找到可用的 LLM 提供商，无法进行文案检测")
-                return True  # 没有LLM时默认放行
+                return None  # 没有LLM时默认放行
 
             # 如果消息过短，可能是纯聊天
             if len(message_text.strip()) < 10:
                 return False
 
-            # 构建检测提示词
-            system_prompt = self._build_system_prompt()
-            user_prompt = self._build_user_prompt(message_text)
+            # 本地分类器有把握时直接采用其判定
+            if self.local_classifier is not None:
+                verdict = self.local_classifier.predict(
+                    message_text, self.local_classifier_confidence
+                )
+                if verdict is not None:
+                    self._local_stats["hits"] += 1
+                    return verdict
+                self._local_stats["misses"] += 1
+
+            # 可信用户只抽查部分消息的 LLM 判定
+            if self.trust_store and self.trust_store.should_skip(
+                event.message_obj.group_id, event.message_obj.sender.user_id
+            ):
+                return None
+
+            # 相同文本优先使用缓存的判定结果
+            is_forward = await self.verdict_cache.get_or_classify(
+                message_text, lambda: self._classify(provider, message_text)
+            )
+            if is_forward is None:
+                logger.warning("LLM 判定失败，默认判断为转发文案")
+            return is_forward
+
+        except Exception as e:
+            logger.error(f"文案检测时发生错误: {e}", exc_info=True)
+            return None
+
+    async def _classify(self, provider, message_text: str) -> Optional[bool]:
+        """判断消息是否为转发文案，启用批量判定时交给批处理器合并调用"""
+        if self.batch_size <= 1:
+            verdict = await self._classify_with_llm(provider, message_text)
+        else:
+            verdict = await self._get_batcher(provider).submit(message_text)
+
+        if verdict is not None and self._local_model_path:
+            self._verdicts_since_train += 1
+            if self._verdicts_since_train >= LOCAL_CLASSIFIER_RETRAIN_INTERVAL and (
+                self._retrain_task is None or self._retrain_task.done()
+            ):
+                self._verdicts_since_train = 0
+                self._retrain_task = asyncio.create_task(
+                    self._train_local_classifier()
+                )
+        return verdict
+
+    def _get_batcher(self, provider) -> MicroBatcher:
+        """获取 LLM 提供商对应的批处理器"""
+        entry = self._batchers.get(id(provider))
+        if entry is None or entry[0] is not provider:
+            batcher = MicroBatcher(
+                lambda texts: self._classify_batch_with_llm(provider, texts),
+                self.batch_size,
+                self.batch_wait_ms,
+            )
+            entry = (provider, batcher)
+            self._batchers[id(provider)] = entry
+        return entry[1]
+
+    async def _load_local_classifier(self) -> None:
+        """加载保存的本地分类器，没有时用历史判定训练"""
+        if os.path.exists(self._local_model_path):
+            try:
+                self.local_classifier = await asyncio.to_thread(
+                    NaiveBayesClassifier.load, self._local_model_path
+                )
+                logger.info(
+                    f"本地文案分类器已加载，训练样本 "
+                    f"{self.local_classifier.sample_count} 条"
+                )
+                return
+            except Exception as e:
+                logger.error(f"加载本地文案分类器失败，将重新训练: {e}")
+        await self._train_local_classifier()
+
+    async def _train_local_classifier(self) -> None:
+        """用最近的 LLM 判定重新训练本地分类器"""
+        samples = await self.verdict_cache.load_samples(LOCAL_CLASSIFIER_MAX_SAMPLES)
+        if len(samples) < LOCAL_CLASSIFIER_MIN_SAMPLES:
+            logger.info(
+                f"LLM 判定样本不足 {LOCAL_CLASSIFIER_MIN_SAMPLES} 条"
+                f"（当前 {len(samples)} 条），暂不启用本地文案分类器"
+            )
+            return
+
+        def train() -> NaiveBayesClassifier:
+            classifier = NaiveBayesClassifier()
+            classifier.train(samples)
+            if classifier.trained:
+                classifier.save(self._local_model_path)
+            return classifier
 
+        try:
+            classifier = await asyncio.to_thread(train)
+        except Exception as e:
+            logger.error(f"训练本地文案分类器失败: {e}")
+            return
+        if classifier.trained:
+            self.local_classifier = classifier
+            logger.info(f"本地文案分类器训练完成，样本 {len(samples)} 条")
+
+    async def _classify_batch_with_llm(
+        self, provider, texts: List[str]
+    ) -> List[Optional[bool]]:
+        """
+        用一次 LLM 调用判断多条消息
+
+        按编号解析每条消息的答案，无法解析的消息单独调用 LLM 判断。
+        """
+        if len(texts) == 1:
+            return [await self._classify_with_llm(provider, texts[0])]
+
+        answers = {}
+        try:
+            llm_resp = await self._text_chat(
+                provider, self._build_batch_user_prompt(texts)
+            )
+            if llm_resp and llm_resp.result_chain:
+                answers = self._parse_batch_response(
+                    llm_resp.result_chain.get_plain_text(), len(texts)
+                )
+        except LLMUnavailableError as e:
+            logger.debug(f"跳过批量文案检测: {e}")
+            return [None] * len(texts)
+        except asyncio.TimeoutError:
+            logger.warning(f"批量调用 LLM 超时，{len(texts)} 条消息默认放行")
+            return [None] * len(texts)
+        except Exception as e:
+            logger.error(f"批量调用 LLM 进行文案检测时发生错误: {e}", exc_info=True)
+            return [None] * len(texts)
+
+        results: List[Optional[bool]] = [None] * len(texts)
+        missing = []
+        for index in range(len(texts)):
+            if index in answers:
+                results[index] = self._parse_llm_response(answers[index])
+            else:
+                missing.append(index)
+
+        if missing:
+            logger.warning(f"批量判定中有 {len(missing)} 条无法解析，改为逐条判断")
+            fallback = await asyncio.gather(
+                *(self._classify_with_llm(provider, texts[i]) for i in missing)
+            )
+            for index, verdict in zip(missing, fallback):
+                results[index] = verdict
+
+        logger.debug(f"批量文案检测完成: {len(texts)} 条消息")
+        return results
+
+    def _parse_batch_response(self, response_text: str, count: int) -> Dict[int, str]:
+        """解析批量判定的响应，返回 {序号(从0开始): 答案}"""
+        answers = {}
+        for match in self.BATCH_ANSWER_PATTERN.finditer(response_text or ""):
+            index = int(match.group(1)) - 1
+            if 0 <= index < count and index not in answers:
+                answers[index] = match.group(2)
+        return answers
+
+    async def _classify_with_llm(self, provider, message_text: str) -> Optional[bool]:
+        """
+        调用 LLM 判断消息是否为转发文案
+
+        Returns:
+            Optional[bool]: 判定结果，LLM 调用失败或响应为空时返回 None
+        """
+        try:
             # 调用 LLM 进行判断
-            llm_resp = await provider.text_chat(
-                prompt=user_prompt,
-                context=[],
-                system_prompt=system_prompt,
+            llm_resp = await self._text_chat(
+                provider, self._build_user_prompt(message_text)
             )
 
             if llm_resp and llm_resp.result_chain:
@@ -118,12 +419,28 @@ class ChatDetector(BaseDetector):
                 )
                 return is_forward
 
-            logger.warning("LLM 响应为空，默认判断为转发文案")
-            return True
+            logger.warning("LLM 响应为空")
+            return None
 
+        except LLMUnavailableError as e:
+            logger.debug(f"跳过文案检测: {e}")
+            return None
+        except asyncio.TimeoutError:
+            logger.warning(f"调用 LLM 超时（{self.llm_gate.timeout_seconds} 秒）")
+            return None
         except Exception as e:
-            logger.error(f"文案检测时发生错误: {e}", exc_info=True)
-            return True
+            logger.error(f"调用 LLM 进行文案检测时发生错误: {e}", exc_info=True)
+            return None
+
+    async def _text_chat(self, provider, prompt: str):
+        """通过调用闸门请求 LLM，熔断、排队已满或超时时抛出异常"""
+        return await self.llm_gate.call(
+            lambda: provider.text_chat(
+                prompt=prompt,
+                context=[],
+                system_prompt=self._build_system_prompt(),
+            )
+        )
 
     def _build_system_prompt(self) -> str:
         """构建系统提示词"""
@@ -157,6 +474,18 @@ class ChatDetector(BaseDetector):
 
 这是转发文案还是纯聊天？请回答"转发文案"或"纯聊天"。"""
 
+    def _build_batch_user_prompt(self, texts: List[str]) -> str:
+        """构建批量判定的用户提示词"""
+        lines = "\n".join(
+            f'{index}. "{" ".join(text.split())}"'
+            for index, text in enumerate(texts, 1)
+        )
+        return f"""请逐条判断以下 {len(texts)} 条消息是"转发文案"还是"纯聊天"：
+
+{lines}
+
+请按编号逐行回答，每行格式为"编号. 转发文案"或"编号. 纯聊天"，不要有其他解释。"""
+
     def _parse_llm_response(self, response_text: str) -> bool:
         """解析 LLM 响应结果"""
         response_text = response_text.strip().lower()
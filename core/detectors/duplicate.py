@@ -1,22 +1,169 @@
 import asyncio
-from typing import Optional
+import os
+import time
+from typing import Dict, Optional, Tuple, Union
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
 from .base import BaseDetector
+from ...models.dedup_index import DedupIndex
+from ...models.dedup_storage import DedupStorage
+from ...models.image_hasher import ImageHasher
+from ...models.memory_record import MemoryMessageRecord
 from ...models.message_record import MessageRecord
+from ...models.sharded_record import ShardedMessageRecord
+from ...models.ttl_cache import TTLCache
+from ...models.lsh_index import SimHashIndex
 from ...utils.rules import AdminRules
-from ...utils.constants import BAN_DURATIONS, WARNING_RECALL_DELAY, DB_CLEANUP_INTERVAL
+from ...utils.fingerprint import (
+    StreamingFingerprint,
+    combine_fingerprints,
+    compute_fingerprint,
+)
+from ...utils.simhash import SimHashBuilder
+from ...utils.media_identity import normalize_media_id
+from ...utils.keyword_matcher import KeywordMatcher
+from ...utils.constants import (
+    BAN_DURATIONS,
+    WARNING_RECALL_DELAY,
+    DB_CLEANUP_INTERVAL,
+    DEDUP_INDEX_MAX_ENTRIES,
+    DB_FLUSH_INTERVAL_MS,
+    DB_FLUSH_BATCH_SIZE,
+    DB_PARTITION_HOURS,
+    DUPLICATE_CHECK_WINDOW,
+    BLOOM_SLICE_CAPACITY,
+    BLOOM_ERROR_RATE,
+    NEAR_DUPLICATE_MAX_DISTANCE,
+    NEAR_DUPLICATE_MIN_LENGTH,
+    NEAR_DUPLICATE_MAX_ENTRIES,
+    CROSS_GROUP_WINDOW,
+    CROSS_GROUP_MIN_LENGTH,
+    CROSS_GROUP_INDEX_MAX_ENTRIES,
+    IMAGE_HASH_MAX_DISTANCE,
+    IMAGE_HASH_WORKERS,
+    IMAGE_HASH_CACHE_SIZE,
+    FORWARD_CACHE_SIZE,
+    FORWARD_CACHE_TTL,
+    FORWARD_MAX_NODES,
+    FORWARD_MAX_BYTES,
+    FORWARD_MAX_DEPTH,
+    FORWARD_FETCH_CONCURRENCY,
+    AD_KEYWORDS,
+    AD_CARD_INDICATORS,
+)
 
 
 class DuplicateDetector(BaseDetector):
     """重复消息检测器"""
 
+    # 无法获取内容的转发消息共用的指纹
+    FORWARD_PLACEHOLDER_FINGERPRINT = compute_fingerprint("forward:message")
+
     def __init__(self, administrator, config):
         super().__init__(administrator, config)
-        self.message_record = MessageRecord()
+        self.message_record = self._create_storage(config)
         self._cleanup_task = None
         self._reminder_tasks = {}
 
+        # 转发消息解析结果缓存，同一转发被多人或多群刷屏时只获取一次
+        self._forward_cache = TTLCache(FORWARD_CACHE_SIZE, FORWARD_CACHE_TTL)
+        self._forward_fetch_semaphore = asyncio.Semaphore(FORWARD_FETCH_CONCURRENCY)
+
+        # 广告匹配器，按配置的关键词构建一次，关键词变化时重新构建
+        self._ad_matchers = None
+
+        # 近似重复检测
+        self.near_duplicate_enabled = config.get("enable_near_duplicate", False)
+        self.near_duplicate_max_distance = config.get(
+            "near_duplicate_max_distance", NEAR_DUPLICATE_MAX_DISTANCE
+        )
+        self.near_duplicate_min_length = config.get(
+            "near_duplicate_min_length", NEAR_DUPLICATE_MIN_LENGTH
+        )
+        self._near_duplicate_indexes: Dict[int, SimHashIndex] = {}
+
+        # 跨群查重，所有监控群共享一个内存索引
+        self.cross_group_index = None
+        if config.get("enable_cross_group_dedup", False):
+            self.cross_group_index = DedupIndex(
+                max(1, config.get("cross_group_window_hours", CROSS_GROUP_WINDOW))
+                * 3600,
+                CROSS_GROUP_INDEX_MAX_ENTRIES,
+            )
+            self.cross_group_index.mark_warmed(True)
+        self.cross_group_min_length = config.get(
+            "cross_group_min_length", CROSS_GROUP_MIN_LENGTH
+        )
+
+        # 图片感知哈希，识别重新上传或重新压缩的相同图片
+        self.image_hasher = None
+        self.image_hash_max_distance = config.get(
+            "image_hash_max_distance", IMAGE_HASH_MAX_DISTANCE
+        )
+        self._image_hash_indexes: Dict[int, SimHashIndex] = {}
+        if config.get("image_hash_mode", "file") == "perceptual":
+            hasher = ImageHasher(
+                config.get("image_hash_workers", IMAGE_HASH_WORKERS),
+                IMAGE_HASH_CACHE_SIZE,
+            )
+            if hasher.available:
+                self.image_hasher = hasher
+            else:
+                logger.warning("未安装 Pillow，图片感知哈希不可用，按文件标识查重")
+
+    def _create_storage(self, config) -> DedupStorage:
+        """根据配置创建去重存储后端"""
+        try:
+            type_windows = AdminRules.parse_type_windows(
+                config.get("dedup_type_windows", [])
+            )
+        except ValueError as e:
+            logger.error(f"查重窗口配置无效，使用默认窗口: {e}")
+            type_windows = {}
+
+        window_hours = config.get("dedup_window_hours", DUPLICATE_CHECK_WINDOW)
+        index_max_entries = config.get(
+            "dedup_index_max_entries", DEDUP_INDEX_MAX_ENTRIES
+        )
+
+        scope = config.get("dedup_scope", "user")
+        if scope not in DedupStorage.SCOPES:
+            logger.warning(f"未知的查重范围 {scope}，使用 user")
+            scope = "user"
+
+        backend = config.get("dedup_storage_backend", "sqlite")
+        if backend == "memory":
+            return MemoryMessageRecord(
+                index_max_entries=index_max_entries,
+                window_hours=window_hours,
+                type_windows=type_windows,
+                scope=scope,
+            )
+
+        record_options = {
+            "scope": scope,
+            "index_max_entries": index_max_entries,
+            "flush_interval_ms": config.get(
+                "dedup_flush_interval_ms", DB_FLUSH_INTERVAL_MS
+            ),
+            "flush_batch_size": config.get(
+                "dedup_flush_batch_size", DB_FLUSH_BATCH_SIZE
+            ),
+            "partition_hours": config.get("dedup_partition_hours", DB_PARTITION_HOURS),
+            "bloom_capacity": config.get("dedup_bloom_capacity", BLOOM_SLICE_CAPACITY),
+            "bloom_error_rate": config.get("dedup_bloom_error_rate", BLOOM_ERROR_RATE),
+        }
+        if backend == "sharded":
+            return ShardedMessageRecord(
+                window_hours=window_hours, type_windows=type_windows, **record_options
+            )
+
+        if backend != "sqlite":
+            logger.warning(f"未知的去重存储后端 {backend}，使用 sqlite")
+        return MessageRecord(
+            window_hours=window_hours, type_windows=type_windows, **record_options
+        )
+
     async def _init_impl(self) -> None:
         """初始化实现"""
         await self.message_record.init_db()
@@ -38,6 +185,23 @@ class DuplicateDetector(BaseDetector):
                 task.cancel()
         self._reminder_tasks.clear()
 
+        # 关闭图片哈希进程池
+        if self.image_hasher is not None:
+            self.image_hasher.close()
+
+        # 关闭数据库连接
+        await self.message_record.close()
+
+    def get_stats(self) -> dict:
+        """获取去重存储后端的状态"""
+        stats = self.message_record.get_stats()
+        stats["forward_cache"] = self._forward_cache.get_stats()
+        if self.cross_group_index is not None:
+            stats["cross_group_index_size"] = len(self.cross_group_index)
+        if self.image_hasher is not None:
+            stats["image_hash"] = self.image_hasher.get_stats()
+        return stats
+
     async def check(self, event: AstrMessageEvent) -> bool:
         """检查并处理重复消息"""
         try:
@@ -68,12 +232,11 @@ class DuplicateDetector(BaseDetector):
                 await self.recall_message(event.message_obj.message_id)
                 return True
 
-            content_hash, message_type, preview = content_info
+            content_key, message_type, preview, signature, text_length = content_info
 
-            # 处理转发消息
-            if content_hash.startswith("forward_async:"):
-                forward_id = content_hash.split(":", 1)[1]
-                forward_content = await self._get_forward_message_content(forward_id)
+            # 处理转发消息，content_key 为转发消息 ID
+            if message_type == "forward":
+                forward_content = await self._get_forward_message_content(content_key)
 
                 if forward_content == "ADVERTISEMENT_DETECTED":
                     await self.recall_message(event.message_obj.message_id)
@@ -86,24 +249,58 @@ class DuplicateDetector(BaseDetector):
                     )
                     return True
                 elif forward_content:
-                    content_hash = f"forward_content:{hash(forward_content)}"
+                    fingerprint, signature = forward_content
                 else:
-                    content_hash = "forward:message"
-
-            # 检查是否为重复消息
-            duplicate_info = await self.message_record.check_duplicate_message(
-                group_id, user_id, content_hash
+                    fingerprint = self.FORWARD_PLACEHOLDER_FINGERPRINT
+            else:
+                fingerprint = content_key
+
+            # 全群查重时，无法获取内容的转发消息彼此无法区分，只与同一用户的比较
+            record_fingerprint = fingerprint
+            if (
+                fingerprint == self.FORWARD_PLACEHOLDER_FINGERPRINT
+                and self.message_record.scope == "group"
+            ):
+                record_fingerprint = compute_fingerprint(f"forward:message:{user_id}")
+
+            # 检查是否为重复消息，不重复时同时完成记录
+            duplicate_info = await self.message_record.check_and_record(
+                group_id, user_id, record_fingerprint, message_type, preview
             )
 
+            # 内容不完全相同时，再检查是否与窗口内的消息近似重复
+            if not duplicate_info and signature is not None:
+                duplicate_info = self._check_near_duplicate(
+                    group_id, user_id, signature, message_type
+                )
+
+            # 图片按感知哈希检查是否为重新上传的相同图片
+            if not duplicate_info and message_type == "image" and self.image_hasher:
+                duplicate_info = await self._check_similar_images(
+                    group_id, user_id, event.message_obj.message
+                )
+
             if duplicate_info:
                 await self.recall_message(event.message_obj.message_id)
-                await self._handle_duplicate_message(group_id, user_id, message_type)
+                await self._handle_duplicate_message(
+                    group_id, user_id, message_type, duplicate_info
+                )
                 return True
-            else:
-                await self.message_record.add_message_record(
-                    group_id, user_id, content_hash, message_type, preview
+
+            # 检查是否刚在其他监控群出现过
+            if self._check_cross_group(
+                group_id, user_id, fingerprint, message_type, text_length
+            ):
+                await self.recall_message(event.message_obj.message_id)
+                await self._handle_ban_and_warning(
+                    group_id,
+                    user_id,
+                    event.message_obj.message_id,
+                    AdminRules.get_ban_duration(message_type),
+                    AdminRules.get_cross_group_warning_message(message_type),
                 )
-                return False
+                return True
+            return False
 
         except Exception as e:
             logger.error(f"检查重复消息时发生错误: {e}", exc_info=True)
@@ -136,13 +333,25 @@ class DuplicateDetector(BaseDetector):
             return True
 
     def _extract_message_content(self, message_chain: list) -> Optional[tuple]:
-        """提取消息内容用于检测"""
+        """
+        提取消息内容用于检测
+
+        Returns:
+            Optional[tuple]: (内容指纹, 消息类型, 预览, 近似签名, 文本长度)；
+                转发消息为 (转发消息ID, "forward", 预览, None, None)
+        """
         if not message_chain:
             return None
 
         supported_types = {"plain", "text", "image", "video", "forward"}
-        text_contents = []
-        media_contents = []
+        # 文本按词写入增量指纹，预览只保留开头部分
+        text_fingerprint = None
+        text_simhash = self._new_simhash_builder()
+        preview_words = []
+        preview_length = 0
+        text_length = 0
+        media_fingerprints = []
+        media_types = []
         forward_content = None
 
         for segment in message_chain:
@@ -153,13 +362,22 @@ class DuplicateDetector(BaseDetector):
 
             if component_type in ["plain", "text"]:
                 text = self._get_text_content(segment)
-                if text and text.strip():
-                    normalized_text = " ".join(text.strip().split())
-                    text_contents.append(normalized_text)
+                for word in text.split() if text else ():
+                    text_length += len(word)
+                    if text_fingerprint is None:
+                        text_fingerprint = StreamingFingerprint("text:", " ")
+                    text_fingerprint.update(word)
+                    if text_simhash is not None:
+                        text_simhash.update(word)
+                    if preview_length < 30:
+                        preview_words.append(word)
+                        preview_length += len(word) + 1
             elif component_type in ["image", "video"]:
                 media_info = self._extract_media_content(segment, component_type)
                 if media_info:
-                    media_contents.append(media_info[0])
+                    media_fingerprints.append(compute_fingerprint(media_info[0]))
+                    if media_info[1] not in media_types:
+                        media_types.append(media_info[1])
             elif component_type == "forward":
                 forward_info = self._extract_forward_content(segment)
                 if forward_info:
@@ -170,42 +388,37 @@ class DuplicateDetector(BaseDetector):
         if forward_content:
             return forward_content
 
-        # 构建混合内容
-        content_parts = []
+        # 构建混合内容，各部分指纹按与顺序无关的方式合并
+        part_fingerprints = []
         preview_parts = []
         message_type = "mixed"
 
-        if text_contents:
-            full_text = " ".join(text_contents)
-            # 使用更稳定的哈希方法
-            content_parts.append(f"text:{full_text}")
-            preview_parts.append(f"文本:{full_text[:30]}")
-            if not media_contents:
+        if text_fingerprint is not None:
+            part_fingerprints.append(text_fingerprint.digest())
+            preview_parts.append(f"文本:{' '.join(preview_words)[:30]}")
+            if not media_fingerprints:
                 message_type = "text"
 
-        if media_contents:
-            content_parts.extend(media_contents)
-            media_types = []
-            for media in media_contents:
-                media_type = media.split(":", 1)[0]
-                if media_type not in media_types:
-                    media_types.append(media_type)
-
+        if media_fingerprints:
+            part_fingerprints.extend(media_fingerprints)
             type_names = {"image": "图片", "video": "视频", "record": "语音"}
             media_display = "+".join([type_names.get(t, t) for t in media_types])
             preview_parts.append(media_display)
 
-            if not text_contents:
+            if text_fingerprint is None:
                 message_type = media_types[0] if len(media_types) == 1 else "mixed"
 
-        if content_parts:
-            # 确保内容哈希的一致性
-            content_hash = "|".join(sorted(content_parts))
+        if part_fingerprints:
+            fingerprint = combine_fingerprints(part_fingerprints)
             preview = "+".join(preview_parts)
+            # 只有纯文本消息参与近似重复检测
+            signature = (
+                self._get_simhash(text_simhash) if message_type == "text" else None
+            )
             logger.debug(
-                f"提取的消息内容 - 类型: {message_type}, 哈希: {content_hash[:50]}..., 预览: {preview}"
+                f"提取的消息内容 - 类型: {message_type}, 指纹: {fingerprint.hex()}, 预览: {preview}"
             )
-            return content_hash, message_type, preview
+            return fingerprint, message_type, preview, signature, text_length
 
         return None
 
@@ -223,7 +436,10 @@ class DuplicateDetector(BaseDetector):
                 if hasattr(segment, attr):
                     value = getattr(segment, attr)
                     if value:
-                        content_hash = f"{component_type}:{value}"
+                        # 去掉 CDN 主机、签名等易变部分，只保留稳定的内容标识
+                        content_hash = (
+                            f"{component_type}:{normalize_media_id(str(value))}"
+                        )
                         type_names = {
                             "image": "图片",
                             "video": "视频",
@@ -243,122 +459,365 @@ class DuplicateDetector(BaseDetector):
                 forward_id = getattr(segment, "id", "")
                 if forward_id:
                     return (
-                        f"forward_async:{forward_id}",
+                        forward_id,
                         "forward",
                         f"转发消息:{forward_id[:20]}...",
+                        None,
+                        None,
                     )
         except Exception:
             pass
         return None
 
-    async def _get_forward_message_content(self, forward_id: str) -> Optional[str]:
-        """获取转发消息的实际内容"""
+    async def _get_forward_message_content(
+        self, forward_id: str
+    ) -> Optional[Union[tuple, str]]:
+        """
+        获取转发消息的内容指纹，优先使用缓存，并发请求同一转发时只获取一次
+
+        Returns:
+            (内容指纹, 近似签名)；检测到广告时返回 "ADVERTISEMENT_DETECTED"；无法获取时返回 None
+        """
+        return await self._forward_cache.get_or_load(
+            forward_id, lambda: self._fetch_forward_message_content(forward_id)
+        )
+
+    async def _fetch_forward_message_content(
+        self, forward_id: str
+    ) -> Optional[Union[tuple, str]]:
+        """
+        获取并解析转发消息
+
+        按层遍历转发消息及其中嵌套的转发，同一层的嵌套转发并发获取。
+        检测到广告后立即停止；节点数或文本字节数超出预算时只对已遍历的部分计算指纹，
+        超大的转发消息耗时可控。
+
+        Returns:
+            (内容指纹, 近似签名)；检测到广告时返回 "ADVERTISEMENT_DETECTED"；无法获取时返回 None
+        """
         try:
             if not self.bot:
                 return None
 
-            result = await self.bot.api.call_action(
-                "get_forward_msg", message_id=forward_id
-            )
+            matchers = self._get_ad_matchers()
+            fingerprint = StreamingFingerprint("forward_content:", "|")
+            text_simhash = self._new_simhash_builder()
+            budget = {"nodes": FORWARD_MAX_NODES, "bytes": FORWARD_MAX_BYTES}
+            seen = {forward_id}
+            level = [forward_id]
 
-            if not result:
+            for depth in range(FORWARD_MAX_DEPTH + 1):
+                if not level or budget["nodes"] <= 0 or budget["bytes"] <= 0:
+                    break
+                bundles = await asyncio.gather(
+                    *(self._load_forward_nodes(item) for item in level)
+                )
+                # 超出深度的嵌套转发不再展开
+                nested = [] if depth < FORWARD_MAX_DEPTH else None
+                for nodes in bundles:
+                    for msg in nodes:
+                        if budget["nodes"] <= 0 or budget["bytes"] <= 0:
+                            break
+                        budget["nodes"] -= 1
+                        hit = self._walk_forward_node(
+                            msg,
+                            fingerprint,
+                            text_simhash,
+                            matchers,
+                            budget,
+                            nested,
+                            seen,
+                        )
+                        if hit:
+                            logger.info(f"转发消息命中广告关键词: {hit}")
+                            return "ADVERTISEMENT_DETECTED"
+                level = nested or []
+
+            if budget["nodes"] <= 0 or budget["bytes"] <= 0:
+                logger.debug(f"转发消息 {forward_id} 超出解析预算，仅使用已遍历部分计算指纹")
+
+            if not fingerprint.count:
                 return None
+            return fingerprint.digest(), self._get_simhash(text_simhash)
 
-            # 获取消息列表
-            messages = None
-            if "data" in result and isinstance(result["data"], dict):
-                messages = result["data"].get("messages", [])
-            elif "messages" in result:
-                messages = result.get("messages", [])
-
-            if not messages:
-                return None
+        except Exception as e:
+            logger.error(f"获取转发消息内容失败: {e}")
+            return None
 
-            # 检测广告内容
-            if await self._check_for_advertisements(messages):
-                return "ADVERTISEMENT_DETECTED"
+    async def _load_forward_nodes(self, item: Union[str, list]) -> list:
+        """
+        获取转发消息的节点列表，item 为转发消息 ID 或已内联的节点列表
 
-            # 提取消息内容
-            content_parts = []
-            for msg in messages:
-                if "raw_message" in msg and msg["raw_message"]:
-                    content_parts.append(msg["raw_message"])
-                elif "message" in msg and isinstance(msg["message"], list):
-                    for msg_part in msg["message"]:
-                        if msg_part.get("type") == "text" and "data" in msg_part:
-                            text_data = msg_part["data"].get("text", "")
-                            if text_data:
-                                content_parts.append(text_data)
-                        elif (
-                            msg_part.get("type") in ["image", "json"]
-                            and "data" in msg_part
-                        ):
-                            data_content = str(msg_part["data"])[:50]
-                            content_parts.append(
-                                f"[{msg_part.get('type')}:{data_content}]"
-                            )
-
-            return "|".join(content_parts) if content_parts else None
+        获取失败（如嵌套转发已过期）时返回空列表，不影响同一转发中的其他部分。
+        """
+        if isinstance(item, list):
+            return item
 
+        try:
+            async with self._forward_fetch_semaphore:
+                result = await self.bot.api.call_action(
+                    "get_forward_msg", message_id=item
+                )
         except Exception as e:
-            logger.error(f"获取转发消息内容失败: {e}")
+            logger.warning(f"获取转发消息 {item} 失败: {e}")
+            return []
+
+        if not result:
+            return []
+        if "data" in result and isinstance(result["data"], dict):
+            return result["data"].get("messages", []) or []
+        return result.get("messages", []) or []
+
+    def _walk_forward_node(
+        self,
+        msg: dict,
+        fingerprint: StreamingFingerprint,
+        text_simhash: Optional[SimHashBuilder],
+        matchers: Tuple[KeywordMatcher, KeywordMatcher],
+        budget: dict,
+        nested: Optional[list],
+        seen: set,
+    ) -> Optional[str]:
+        """
+        处理转发消息中的一个节点：检测广告、写入指纹并收集嵌套的转发
+
+        Returns:
+            Optional[str]: 命中的广告关键词
+        """
+        keyword_matcher, indicator_matcher = matchers
+
+        def feed(text: str) -> None:
+            budget["bytes"] -= len(text.encode("utf-8"))
+            fingerprint.update(text)
+            if text_simhash is not None:
+                text_simhash.update(text)
+
+        raw_message = msg.get("raw_message")
+        if raw_message:
+            hit = keyword_matcher.search(raw_message)
+            if hit:
+                return hit
+            feed(raw_message)
+
+        parts = msg.get("message") or msg.get("content")
+        if not isinstance(parts, list):
             return None
 
-    async def _check_for_advertisements(self, messages: list) -> bool:
-        """检测转发消息中的广告内容"""
-        try:
-            ad_keywords = [
-                "推荐群聊",
-                "群聊推荐",
-                "进群",
-                "加群",
-                "群号",
-                "QQ群",
-                "微信群",
-                "telegram",
-                "tg群",
-                "扫码进群",
-                "点击进群",
-                "群二维码",
-            ]
-
-            group_card_indicators = [
-                "com.tencent.troopsharecard",
-                "推荐群聊",
-                "contact",
-                "jumpUrl",
-                "qm.qq.com",
-                "group_code",
-            ]
-
-            for msg in messages:
-                # 检查raw_message
-                if "raw_message" in msg and msg["raw_message"]:
-                    raw_msg = msg["raw_message"].lower()
-                    if any(keyword in raw_msg for keyword in ad_keywords):
-                        return True
-
-                # 检查message链
-                if "message" in msg and isinstance(msg["message"], list):
-                    for msg_part in msg["message"]:
-                        if msg_part.get("type") == "text" and "data" in msg_part:
-                            text_data = msg_part["data"].get("text", "").lower()
-                            if any(keyword in text_data for keyword in ad_keywords):
-                                return True
-                        elif msg_part.get("type") == "json" and "data" in msg_part:
-                            json_data = msg_part["data"].get("data", "").lower()
-                            if any(
-                                indicator.lower() in json_data
-                                for indicator in group_card_indicators
-                            ):
-                                return True
+        for msg_part in parts:
+            part_type = msg_part.get("type")
+            data = msg_part.get("data")
+            if not isinstance(data, dict):
+                continue
+
+            if part_type == "text":
+                text_data = data.get("text", "")
+                hit = keyword_matcher.search(text_data)
+                if hit:
+                    return hit
+                if text_data and not raw_message:
+                    feed(text_data)
+            elif part_type == "json":
+                hit = indicator_matcher.search(data.get("data", ""))
+                if hit:
+                    return hit
+                if not raw_message:
+                    fingerprint.update(f"[json:{str(data)[:50]}]")
+            elif part_type == "image":
+                if not raw_message:
+                    media_id = data.get("file") or data.get("url")
+                    data_content = (
+                        normalize_media_id(str(media_id))
+                        if media_id
+                        else str(data)[:50]
+                    )
+                    fingerprint.update(f"[image:{data_content}]")
+            elif part_type == "forward" and nested is not None:
+                # 嵌套转发优先使用内联的内容，否则按 ID 获取
+                content = data.get("content")
+                nested_id = data.get("id")
+                if isinstance(content, list):
+                    nested.append(content)
+                elif nested_id and nested_id not in seen:
+                    seen.add(nested_id)
+                    nested.append(nested_id)
+        return None
+
+    def _new_simhash_builder(self) -> Optional[SimHashBuilder]:
+        """未启用近似重复检测时返回 None，避免额外计算"""
+        return SimHashBuilder() if self.near_duplicate_enabled else None
+
+    def _get_simhash(self, builder: Optional[SimHashBuilder]) -> Optional[int]:
+        """获取近似签名，内容过短时返回 None"""
+        if builder is None or builder.length < self.near_duplicate_min_length:
+            return None
+        return builder.digest()
+
+    def _check_near_duplicate(
+        self, group_id: int, user_id: int, signature: int, message_type: str
+    ) -> Optional[dict]:
+        """检查窗口内是否有近似重复的消息，并记录本条消息的签名
+
+        Returns:
+            Optional[dict]: 近似重复时返回首次发送的记录信息，否则返回 None
+        """
+        return self._check_similar(
+            self._near_duplicate_indexes,
+            self.near_duplicate_max_distance,
+            group_id,
+            user_id,
+            signature,
+            message_type,
+        )
+
+    async def _check_similar_images(
+        self, group_id: int, user_id: int, message_chain: list
+    ) -> Optional[dict]:
+        """按感知哈希检查消息中的图片是否与窗口内的图片相同"""
+        segments = [
+            segment
+            for segment in message_chain
+            if self.get_component_type(segment) == "image"
+        ]
+        signatures = await asyncio.gather(
+            *(
+                self.image_hasher.get_hash(
+                    normalize_media_id(
+                        str(getattr(segment, "file", "") or getattr(segment, "url", ""))
+                    ),
+                    lambda segment=segment: self._resolve_image_path(segment),
+                )
+                for segment in segments
+            )
+        )
+
+        duplicate_info = None
+        for signature in signatures:
+            if signature is None:
+                continue
+            match = self._check_similar(
+                self._image_hash_indexes,
+                self.image_hash_max_distance,
+                group_id,
+                user_id,
+                signature,
+                "image",
+            )
+            duplicate_info = duplicate_info or match
+        return duplicate_info
+
+    async def _resolve_image_path(self, segment) -> Optional[str]:
+        """获取图片的本地路径，本地不存在时由协议端下载到本地"""
+        for attr in ["path", "file"]:
+            value = str(getattr(segment, attr, "") or "")
+            if value.startswith("file://"):
+                value = value[len("file://") :]
+            if value and os.path.isfile(value):
+                return value
+
+        file_id = getattr(segment, "file", None)
+        if not file_id or not self.bot:
+            return None
+        result = await self.bot.api.call_action("get_image", file=file_id)
+        if isinstance(result, dict) and isinstance(result.get("data"), dict):
+            result = result["data"]
+        path = result.get("file") if isinstance(result, dict) else None
+        if path and os.path.isfile(path):
+            return path
+        return None
+
+    def _check_similar(
+        self,
+        indexes: Dict[int, SimHashIndex],
+        max_distance: int,
+        group_id: int,
+        user_id: int,
+        signature: int,
+        message_type: str,
+    ) -> Optional[dict]:
+        """在群的相似签名索引中查询窗口内的相似记录，未命中时记录本条签名"""
+        index = indexes.get(group_id)
+        if index is None:
+            index = SimHashIndex(
+                self.message_record.max_window,
+                max_distance,
+                NEAR_DUPLICATE_MAX_ENTRIES,
+            )
+            indexes[group_id] = index
+
+        now = time.time()
+        match = index.query(
+            signature,
+            now,
+            owner=user_id if self.message_record.scope == "user" else None,
+            window_seconds=self.message_record.get_window(message_type),
+        )
+        if not match:
+            index.add(signature, now, user_id)
+            return None
 
+        created_at, distance, first_user_id = match
+        logger.debug(
+            f"检测到相似内容 - 群: {group_id}, 用户: {user_id}, 类型: {message_type}, 距离: {distance}"
+        )
+        return {
+            "user_id": first_user_id,
+            "message_type": message_type,
+            "content_preview": None,
+            "created_at": created_at,
+        }
+
+    def _check_cross_group(
+        self,
+        group_id: int,
+        user_id: int,
+        fingerprint: bytes,
+        message_type: str,
+        text_length: Optional[int],
+    ) -> bool:
+        """检查内容是否在窗口内已出现在其他监控群，并记录首次出现的群"""
+        if (
+            self.cross_group_index is None
+            or fingerprint == self.FORWARD_PLACEHOLDER_FINGERPRINT
+        ):
+            return False
+        # 过短的纯文本在不同群中自然重复的概率很高，不参与跨群查重
+        if message_type == "text" and (text_length or 0) < self.cross_group_min_length:
             return False
 
-        except Exception as e:
-            logger.error(f"检测广告内容时发生错误: {e}")
+        now = time.time()
+        self.cross_group_index.expire(now)
+        entry = self.cross_group_index.lookup(fingerprint, now)
+        if entry is None:
+            self.cross_group_index.add(fingerprint, now, group_id)
+            return False
+
+        first_group_id = entry[1]
+        if str(first_group_id) == str(group_id):
             return False
 
+        logger.info(
+            f"检测到跨群重复内容 - 群: {group_id}, 用户: {user_id}, 首次出现于群: {first_group_id}"
+        )
+        return True
+
+    def _get_ad_matchers(self) -> Tuple[KeywordMatcher, KeywordMatcher]:
+        """获取广告关键词和卡片特征匹配器，配置变化时重新构建"""
+        keywords = tuple(self.config.get("ad_keywords", AD_KEYWORDS))
+        indicators = tuple(self.config.get("ad_card_indicators", AD_CARD_INDICATORS))
+        if self._ad_matchers is None or self._ad_matchers[0] != (keywords, indicators):
+            if self._ad_matchers is not None:
+                # 已缓存的广告判定基于旧关键词，需要重新检测
+                self._forward_cache.clear()
+            self._ad_matchers = (
+                (keywords, indicators),
+                KeywordMatcher(keywords),
+                KeywordMatcher(indicators),
+            )
+            logger.info(
+                f"广告匹配器已构建，关键词 {len(keywords)} 个，卡片特征 {len(indicators)} 个"
+            )
+        return self._ad_matchers[1], self._ad_matchers[2]
+
     async def _handle_ban_and_warning(
         self,
         group_id: int,
@@ -394,12 +853,28 @@ class DuplicateDetector(BaseDetector):
             logger.error(f"执行禁言和警告时发生错误: {e}")
 
     async def _handle_duplicate_message(
-        self, group_id: int, user_id: int, message_type: str
+        self,
+        group_id: int,
+        user_id: int,
+        message_type: str,
+        duplicate_info: Optional[dict] = None,
     ):
         """处理重复消息"""
         try:
             ban_duration = AdminRules.get_ban_duration(message_type)
-            warning_msg = AdminRules.get_warning_message(message_type)
+            first_user_id = (duplicate_info or {}).get("user_id")
+            if first_user_id is not None and str(first_user_id) != str(user_id):
+                # 全群范围查重时，提示内容已由其他群友发过
+                warning_msg = AdminRules.get_repost_warning_message(
+                    message_type,
+                    first_user_id,
+                    time.time() - duplicate_info["created_at"],
+                )
+            else:
+                window_hours = self.message_record.get_window(message_type) // 3600
+                warning_msg = AdminRules.get_warning_message(
+                    message_type, window_hours
+                )
             await self._handle_ban_and_warning(
                 group_id, user_id, None, ban_duration, warning_msg
             )
@@ -422,7 +897,17 @@ class DuplicateDetector(BaseDetector):
             try:
                 await asyncio.sleep(DB_CLEANUP_INTERVAL)
                 await self.message_record.cleanup_old_records()
+                self._expire_similarity_indexes()
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"清理过期记录时发生错误: {e}")
+
+    def _expire_similarity_indexes(self) -> None:
+        """清理近似重复和图片感知哈希索引中的过期签名"""
+        now = time.time()
+        for indexes in [self._near_duplicate_indexes, self._image_hash_indexes]:
+            for group_id in list(indexes):
+                indexes[group_id].expire(now)
+                if not len(indexes[group_id]):
+                    del indexes[group_id]
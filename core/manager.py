@@ -1,3 +1,5 @@
+import asyncio
+import json
 from typing import Dict, Optional, TYPE_CHECKING
 from astrbot.api import logger
 from astrbot.api.event import AstrMessageEvent
@@ -5,6 +7,7 @@ from .detectors.curfew import CurfewManager
 from .detectors.duplicate import DuplicateDetector
 from .detectors.chat import ChatDetector
 from .detectors.poke import PokeDetector
+from ..utils.constants import STATS_LOG_INTERVAL
 
 if TYPE_CHECKING:
     from ..main import Administrator
@@ -29,17 +32,21 @@ class DetectorManager:
             ("duplicate", self.duplicate_detector),
             ("chat", self.chat_detector),
         ]
+        self._stats_task: Optional[asyncio.Task] = None
 
     async def init_all(self) -> None:
         """初始化所有检测器"""
         try:
             # 初始化各个检测器
             await self.duplicate_detector.init()
+            await self.chat_detector.init()
             await self.curfew_manager.init()
 
             # 启动宵禁功能
             await self.curfew_manager.start_all_curfews()
 
+            self._stats_task = asyncio.create_task(self._stats_scheduler())
+
             logger.info("所有检测器初始化完成")
         except Exception as e:
             logger.error(f"检测器初始化失败: {e}", exc_info=True)
@@ -48,13 +55,44 @@ class DetectorManager:
     async def stop_all(self) -> None:
         """停止所有检测器"""
         try:
+            if self._stats_task and not self._stats_task.done():
+                self._stats_task.cancel()
+                try:
+                    await self._stats_task
+                except asyncio.CancelledError:
+                    pass
+            self._stats_task = None
+
             await self.duplicate_detector.stop()
+            await self.chat_detector.stop()
             await self.curfew_manager.stop()
             await self.poke_detector.stop()
             logger.info("所有检测器已停止")
         except Exception as e:
             logger.error(f"停止检测器时发生错误: {e}", exc_info=True)
 
+    def get_stats(self) -> dict:
+        """获取各检测器的运行指标"""
+        return {
+            "duplicate": self.duplicate_detector.get_stats(),
+            "chat": self.chat_detector.get_stats(),
+        }
+
+    def format_stats(self) -> str:
+        """把运行指标格式化为便于阅读的文本"""
+        return json.dumps(self.get_stats(), ensure_ascii=False, indent=2, default=str)
+
+    async def _stats_scheduler(self) -> None:
+        """定期把运行指标写入日志"""
+        while True:
+            try:
+                await asyncio.sleep(STATS_LOG_INTERVAL)
+                logger.info(f"运行指标: {self.format_stats()}")
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"获取运行指标时发生错误: {e}")
+
     async def check_message(self, event: "AstrMessageEvent") -> bool:
         """
         检查消息
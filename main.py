@@ -52,6 +52,12 @@ class Administrator(Star):
         """处理群消息"""
         await self.message_handler.handle_group_message(event)
 
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("banshi_stats")
+    async def show_stats(self, event: AstrMessageEvent):
+        """查看去重、LLM 判定等运行指标（仅管理员）"""
+        yield event.plain_result(self.detector_manager.format_stats())
+
     async def terminate(self):
         """插件卸载时的清理工作"""
         try:
@@ -1,6 +1,34 @@
 """数据模型"""
 
+from .bloom_filter import TimeSlicedBloomFilter
 from .curfew_info import CurfewInfo
+from .dedup_index import DedupIndex
+from .dedup_storage import DedupStorage
+from .image_hasher import ImageHasher
+from .lsh_index import SimHashIndex
+from .llm_gate import LLMGate, LLMUnavailableError
+from .memory_record import MemoryMessageRecord
+from .micro_batcher import MicroBatcher
 from .message_record import MessageRecord
+from .sharded_record import ShardedMessageRecord
+from .trust_store import TrustStore
+from .ttl_cache import TTLCache
+from .verdict_cache import VerdictCache
 
-__all__ = ["CurfewInfo", "MessageRecord"]
+__all__ = [
+    "CurfewInfo",
+    "DedupIndex",
+    "DedupStorage",
+    "ImageHasher",
+    "MemoryMessageRecord",
+    "LLMGate",
+    "LLMUnavailableError",
+    "MessageRecord",
+    "MicroBatcher",
+    "ShardedMessageRecord",
+    "SimHashIndex",
+    "TrustStore",
+    "TTLCache",
+    "VerdictCache",
+    "TimeSlicedBloomFilter",
+]
@@ -0,0 +1,102 @@
+import math
+from collections import OrderedDict
+from typing import Optional
+
+
+class TimeSlicedBloomFilter:
+    """按时间分片的布隆过滤器
+
+    每个时间片（默认一小时）一个位数组，查询只检查与时间窗口重叠的分片，
+    超出窗口的分片整体丢弃。返回 False 时可确定该记录从未出现过。
+    """
+
+    def __init__(
+        self,
+        window_seconds: int,
+        slice_seconds: int = 3600,
+        capacity: int = 10000,
+        error_rate: float = 0.01,
+    ):
+        self.window_seconds = window_seconds
+        self.slice_seconds = max(1, slice_seconds)
+        self.capacity = max(1, capacity)
+        self.error_rate = min(max(error_rate, 1e-6), 0.5)
+
+        # 按目标容量和误判率计算位数与哈希函数个数
+        self.num_bits = max(
+            8, int(-self.capacity * math.log(self.error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+
+        # 分片起始时间 -> [位数组, 已写入数量]
+        self._slices: "OrderedDict[int, list]" = OrderedDict()
+
+    def _positions(self, item: bytes, salt: int):
+        """双重哈希生成位位置，item 应为均匀分布的指纹"""
+        mask = (1 << 64) - 1
+        h1 = int.from_bytes(item[:8], "little") ^ ((salt * 0x9E3779B97F4A7C15) & mask)
+        h2 = int.from_bytes(item[8:16], "little") | 1
+        for i in range(self.num_hashes):
+            yield ((h1 + i * h2) & mask) % self.num_bits
+
+    def add(self, item: bytes, ts: float, salt: int = 0) -> None:
+        """写入记录"""
+        start = int(ts) - int(ts) % self.slice_seconds
+        entry = self._slices.get(start)
+        if entry is None:
+            entry = [bytearray((self.num_bits + 7) // 8), 0]
+            out_of_order = self._slices and start < next(reversed(self._slices))
+            self._slices[start] = entry
+            if out_of_order:
+                # 保持分片按时间排序
+                self._slices = OrderedDict(sorted(self._slices.items()))
+            self.rotate(ts)
+
+        bits = entry[0]
+        for pos in self._positions(item, salt):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        entry[1] += 1
+
+    def might_contain(
+        self,
+        item: bytes,
+        now: float,
+        salt: int = 0,
+        window_seconds: Optional[int] = None,
+    ) -> bool:
+        """判断记录是否可能在窗口内出现过"""
+        cutoff = now - (window_seconds or self.window_seconds)
+        positions = None
+        for start, (bits, _) in reversed(self._slices.items()):
+            if start + self.slice_seconds <= cutoff:
+                break
+            if positions is None:
+                positions = list(self._positions(item, salt))
+            if all(bits[pos >> 3] & (1 << (pos & 7)) for pos in positions):
+                return True
+        return False
+
+    def rotate(self, now: float) -> int:
+        """丢弃窗口外的分片，返回丢弃数量"""
+        cutoff = now - self.window_seconds
+        removed = 0
+        while self._slices:
+            start = next(iter(self._slices))
+            if start + self.slice_seconds > cutoff:
+                break
+            self._slices.popitem(last=False)
+            removed += 1
+        return removed
+
+    @property
+    def memory_bytes(self) -> int:
+        """位数组占用的内存"""
+        return len(self._slices) * ((self.num_bits + 7) // 8)
+
+    def estimated_fp_rate(self) -> float:
+        """根据各分片写入数量估算整个窗口的误判率"""
+        miss_all = 1.0
+        for _, count in self._slices.values():
+            fill = 1 - math.exp(-self.num_hashes * count / self.num_bits)
+            miss_all *= 1 - fill**self.num_hashes
+        return 1 - miss_all
@@ -0,0 +1,69 @@
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class DedupIndex:
+    """内存热窗口去重索引
+
+    以 (group_id, user_id, message_hash) 为键记录最近一次出现的时间戳（UTC 秒），
+    同时保存首发者，按插入顺序保存，窗口外的记录从头部过期，超出容量时淘汰最旧的记录。
+    只要没有窗口内的记录被淘汰，未命中即可直接判定为新消息，无需访问数据库。
+    """
+
+    def __init__(self, window_seconds: int, max_entries: int):
+        self.window_seconds = window_seconds
+        self.max_entries = max(1, max_entries)
+        # 键 -> (时间戳, 首发者)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Hashable]]" = OrderedDict()
+        # 因容量被淘汰的记录中最新的时间戳
+        self._evicted_until = 0.0
+        self._warmed = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(
+        self, key: Hashable, now: float, window_seconds: Optional[int] = None
+    ) -> Optional[Tuple[float, Hashable]]:
+        """查询窗口内的记录，返回 (时间戳, 首发者)
+
+        window_seconds 可指定比索引窗口更短的窗口。
+        """
+        window = window_seconds or self.window_seconds
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now - window:
+            return None
+        return entry
+
+    def add(self, key: Hashable, ts: float, poster: Hashable = None) -> None:
+        """写入记录，超出容量时淘汰最旧的记录"""
+        self._entries[key] = (ts, poster)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            _, (evicted_ts, _) = self._entries.popitem(last=False)
+            self._evicted_until = max(self._evicted_until, evicted_ts)
+
+    def expire(self, now: float) -> int:
+        """移除窗口外的记录，返回移除数量"""
+        cutoff = now - self.window_seconds
+        removed = 0
+        while self._entries:
+            ts, _ = next(iter(self._entries.values()))
+            if ts > cutoff:
+                break
+            self._entries.popitem(last=False)
+            removed += 1
+        return removed
+
+    def mark_warmed(self, complete: bool, oldest_ts: float = 0.0) -> None:
+        """标记预热完成；预热不完整时，早于 oldest_ts 的记录视为已淘汰"""
+        self._warmed = True
+        if not complete:
+            self._evicted_until = max(self._evicted_until, oldest_ts)
+
+    def is_authoritative(
+        self, now: float, window_seconds: Optional[int] = None
+    ) -> bool:
+        """未命中是否可以直接判定为新消息"""
+        window = window_seconds or self.window_seconds
+        return self._warmed and self._evicted_until <= now - window
@@ -0,0 +1,82 @@
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from ..utils.constants import DUPLICATE_CHECK_WINDOW
+
+
+class DedupStorage(ABC):
+    """去重存储后端基类"""
+
+    # 查重范围：user 只匹配同一用户，group 匹配全群
+    SCOPES = ("user", "group")
+
+    # 全群范围的记录以该值代替 user_id 作为键，首发者另行记录
+    GROUP_SCOPE_USER_ID = 0
+
+    def __init__(
+        self,
+        window_hours: int = DUPLICATE_CHECK_WINDOW,
+        type_windows: Optional[Dict[str, int]] = None,
+        scope: str = "user",
+    ):
+        if scope not in self.SCOPES:
+            raise ValueError(f"无效的查重范围: {scope}")
+        self.scope = scope
+        # 查重时间窗口（秒），可按消息类型单独配置
+        self.window_seconds = max(1, window_hours) * 3600
+        self.type_windows = {
+            message_type: max(1, hours) * 3600
+            for message_type, hours in (type_windows or {}).items()
+        }
+        self.max_window = max([self.window_seconds, *self.type_windows.values()])
+
+    def get_window(self, message_type: str) -> int:
+        """获取消息类型对应的查重时间窗口（秒）"""
+        return self.type_windows.get(message_type, self.window_seconds)
+
+    def scope_key(
+        self, group_id: int, user_id: int, fingerprint: bytes
+    ) -> Tuple[int, int, bytes]:
+        """获取查重键，全群范围时不区分用户"""
+        if self.scope == "group":
+            return group_id, self.GROUP_SCOPE_USER_ID, fingerprint
+        return group_id, user_id, fingerprint
+
+    @abstractmethod
+    async def init_db(self) -> None:
+        """初始化存储"""
+        pass
+
+    @abstractmethod
+    async def close(self) -> None:
+        """写入剩余数据并释放资源"""
+        pass
+
+    @abstractmethod
+    async def check_and_record(
+        self,
+        group_id: int,
+        user_id: int,
+        fingerprint: bytes,
+        message_type: str,
+        content_preview: str = "",
+    ) -> Optional[dict]:
+        """
+        检查是否为重复消息（时间窗口内同一用户或全群），不重复时记录该消息
+
+        Args:
+            fingerprint: 由 compute_fingerprint 生成的消息内容指纹
+
+        Returns:
+            Optional[dict]: 重复时返回首次发送的记录信息，user_id 为首发者，否则返回 None
+        """
+        pass
+
+    @abstractmethod
+    async def cleanup_old_records(self) -> None:
+        """清理过期记录"""
+        pass
+
+    @abstractmethod
+    def get_stats(self) -> dict:
+        """获取存储状态"""
+        pass
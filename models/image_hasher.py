@@ -0,0 +1,98 @@
+import asyncio
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Awaitable, Callable, Dict, Optional
+from astrbot.api import logger
+from ..utils.image_hash import Image, compute_dhash
+
+
+class ImageHasher:
+    """图片感知哈希计算器
+
+    在进程池中解码图片，不阻塞事件循环；按平台文件 ID 缓存最近的结果，
+    同一图片只解码一次，并发请求同一图片时共享同一次计算。
+    """
+
+    def __init__(self, max_workers: int = 2, cache_size: int = 10000):
+        self.max_workers = max(1, max_workers)
+        self.cache_size = max(1, cache_size)
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._stats = {"hits": 0, "misses": 0, "failures": 0}
+
+    @property
+    def available(self) -> bool:
+        """是否安装了 Pillow"""
+        return Image is not None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 不使用 Linux 默认的 fork：从带有 aiosqlite 线程和事件循环的进程 fork，
+            # 子进程可能因继承已被持有的锁而死锁。spawn 启动的子进程只导入
+            # compute_dhash 所在的模块
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def get_hash(
+        self, file_id: str, resolve_path: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[int]:
+        """
+        获取图片的感知哈希
+
+        Args:
+            file_id: 平台文件 ID，用作缓存键
+            resolve_path: 缓存未命中时获取本地图片路径的协程函数
+
+        Returns:
+            Optional[int]: 64 位签名，无法获取时返回 None
+        """
+        if not self.available or not file_id:
+            return None
+
+        value = self._cache.get(file_id)
+        if value is not None:
+            self._cache.move_to_end(file_id)
+            self._stats["hits"] += 1
+            return value
+
+        future = self._inflight.get(file_id)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[file_id] = future
+        value = None
+        try:
+            path = await resolve_path()
+            if path:
+                value = await asyncio.get_running_loop().run_in_executor(
+                    self._get_executor(), compute_dhash, path
+                )
+        except Exception as e:
+            self._stats["failures"] += 1
+            logger.error(f"计算图片感知哈希失败: {e}")
+        finally:
+            self._inflight.pop(file_id, None)
+            future.set_result(value)
+
+        if value is not None:
+            self._cache[file_id] = value
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def get_stats(self) -> dict:
+        """获取缓存命中情况"""
+        return {"cache_size": len(self._cache), **self._stats}
+
+    def close(self) -> None:
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque
+
+
+class LLMUnavailableError(Exception):
+    """熔断或排队已满时拒绝调用 LLM"""
+
+
+class LLMGate:
+    """LLM 调用闸门
+
+    限制同时进行的调用数量，为每次调用设置超时，并在连续失败后熔断：
+    熔断期间直接拒绝调用，冷却结束后放行一次试探调用，成功则恢复。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        timeout_seconds: float,
+        failure_threshold: int,
+        cooldown_seconds: float,
+        max_pending: int,
+        latency_samples: int = 200,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout_seconds = timeout_seconds
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_seconds = cooldown_seconds
+        self.max_pending = max(0, max_pending)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._pending = 0
+        self._in_flight = 0
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._latencies: Deque[float] = deque(maxlen=max(1, latency_samples))
+        self._stats = {"calls": 0, "timeouts": 0, "errors": 0, "rejected": 0}
+
+    @property
+    def state(self) -> str:
+        """熔断器状态，冷却结束后视为半开"""
+        if (
+            self._state == self.OPEN
+            and time.monotonic() - self._opened_at >= self.cooldown_seconds
+        ):
+            return self.HALF_OPEN
+        return self._state
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        通过闸门执行一次调用
+
+        Raises:
+            LLMUnavailableError: 熔断中或排队已满
+            asyncio.TimeoutError: 调用超时
+        """
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probing):
+            self._stats["rejected"] += 1
+            raise LLMUnavailableError("LLM 调用已熔断")
+        if self._pending >= self.max_pending and self._semaphore.locked():
+            self._stats["rejected"] += 1
+            raise LLMUnavailableError("LLM 调用排队已满")
+
+        probe = state == self.HALF_OPEN
+        if probe:
+            self._probing = True
+        try:
+            self._pending += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self._pending -= 1
+            try:
+                # 排队期间可能已经熔断
+                if not probe and self._state == self.OPEN:
+                    self._stats["rejected"] += 1
+                    raise LLMUnavailableError("LLM 调用已熔断")
+                return await self._invoke(func)
+            finally:
+                self._semaphore.release()
+        finally:
+            if probe:
+                self._probing = False
+
+    async def _invoke(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        self._stats["calls"] += 1
+        self._in_flight += 1
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(func(), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            self._stats["timeouts"] += 1
+            self._record_failure()
+            raise
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._stats["errors"] += 1
+            self._record_failure()
+            raise
+        finally:
+            self._in_flight -= 1
+
+        self._latencies.append(time.monotonic() - start)
+        self._failures = 0
+        self._state = self.CLOSED
+        return result
+
+    def _record_failure(self) -> None:
+        self._failures += 1
+        if self._state != self.CLOSED or self._failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+    def get_stats(self) -> dict:
+        """获取排队深度、熔断状态和调用耗时分位数"""
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(p * len(latencies)))
+            return round(latencies[index] * 1000, 1)
+
+        return {
+            "state": self.state,
+            "queue_depth": self._pending,
+            "in_flight": self._in_flight,
+            "consecutive_failures": self._failures,
+            **self._stats,
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p90": percentile(0.9),
+                "p99": percentile(0.99),
+            },
+        }
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+from ..utils.simhash import SIMHASH_BITS, hamming_distance
+
+
+class SimHashIndex:
+    """SimHash 分段 LSH 索引
+
+    把 64 位签名切成 max_distance + 1 段，汉明距离不超过 max_distance 的两个
+    签名至少有一段完全相同（抽屉原理），因此只需比较同段相同的候选记录。
+    记录按写入顺序保存，超出时间窗口或容量后从头部移除。
+    """
+
+    def __init__(
+        self, window_seconds: int, max_distance: int = 3, max_entries: int = 50000
+    ):
+        self.window_seconds = window_seconds
+        self.max_distance = max(0, max_distance)
+        self.max_entries = max(1, max_entries)
+
+        bands = min(self.max_distance + 1, SIMHASH_BITS)
+        width = SIMHASH_BITS // bands
+        # 每段的 (起始位, 掩码)，最后一段包含剩余的位
+        self._bands: List[Tuple[int, int]] = []
+        for i in range(bands):
+            bits = width if i < bands - 1 else SIMHASH_BITS - i * width
+            self._bands.append((i * width, (1 << bits) - 1))
+
+        # 记录 ID -> (签名, 时间戳, 所属用户)
+        self._entries: "OrderedDict[int, Tuple[int, float, Hashable]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, int], Set[int]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, signature: int):
+        for band, (shift, mask) in enumerate(self._bands):
+            yield band, (signature >> shift) & mask
+
+    def add(self, signature: int, ts: float, owner: Hashable = None) -> None:
+        """写入签名，超出容量时移除最旧的记录"""
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (signature, ts, owner)
+        for key in self._band_keys(signature):
+            self._buckets.setdefault(key, set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove_oldest()
+
+    def query(
+        self,
+        signature: int,
+        now: float,
+        owner: Hashable = None,
+        window_seconds: Optional[int] = None,
+    ) -> Optional[Tuple[float, int, Hashable]]:
+        """
+        查询窗口内最相似的记录
+
+        Args:
+            owner: 只匹配该用户的记录，为 None 时匹配所有记录
+
+        Returns:
+            Optional[tuple]: (时间戳, 汉明距离, 所属用户)
+        """
+        cutoff = now - (window_seconds or self.window_seconds)
+        best = None
+        seen = set()
+        for key in self._band_keys(signature):
+            for entry_id in self._buckets.get(key, ()):
+                if entry_id in seen:
+                    continue
+                seen.add(entry_id)
+                other, ts, entry_owner = self._entries[entry_id]
+                if ts <= cutoff or (owner is not None and entry_owner != owner):
+                    continue
+                distance = hamming_distance(signature, other)
+                if distance <= self.max_distance and (
+                    best is None or distance < best[1]
+                ):
+                    best = (ts, distance, entry_owner)
+        return best
+
+    def expire(self, now: float) -> int:
+        """移除窗口外的记录，返回移除数量"""
+        cutoff = now - self.window_seconds
+        removed = 0
+        while self._entries:
+            _, ts, _ = next(iter(self._entries.values()))
+            if ts > cutoff:
+                break
+            self._remove_oldest()
+            removed += 1
+        return removed
+
+    def _remove_oldest(self) -> None:
+        entry_id, (signature, _, _) = self._entries.popitem(last=False)
+        for key in self._band_keys(signature):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[key]
@@ -0,0 +1,64 @@
+import time
+from typing import Dict, Optional
+from .dedup_index import DedupIndex
+from .dedup_storage import DedupStorage
+from ..utils.constants import DUPLICATE_CHECK_WINDOW, DEDUP_INDEX_MAX_ENTRIES
+
+
+class MemoryMessageRecord(DedupStorage):
+    """纯内存消息记录，适合小规模部署，重启后记录丢失"""
+
+    def __init__(
+        self,
+        index_max_entries: int = DEDUP_INDEX_MAX_ENTRIES,
+        window_hours: int = DUPLICATE_CHECK_WINDOW,
+        type_windows: Optional[Dict[str, int]] = None,
+        scope: str = "user",
+    ):
+        super().__init__(window_hours, type_windows, scope)
+        self.index = DedupIndex(self.max_window, index_max_entries)
+
+    async def init_db(self) -> None:
+        """初始化存储"""
+        self.index.mark_warmed(True)
+
+    async def close(self) -> None:
+        """释放内存记录"""
+        pass
+
+    async def check_and_record(
+        self,
+        group_id: int,
+        user_id: int,
+        fingerprint: bytes,
+        message_type: str,
+        content_preview: str = "",
+    ) -> Optional[dict]:
+        """
+        检查是否为重复消息（时间窗口内同一用户或全群），不重复时记录该消息
+
+        Returns:
+            Optional[dict]: 重复时返回首次发送的记录信息，否则返回 None
+        """
+        key = self.scope_key(group_id, user_id, fingerprint)
+        now = int(time.time())
+
+        entry = self.index.lookup(key, now, self.get_window(message_type))
+        if entry is not None:
+            return {
+                "user_id": entry[1],
+                "message_type": message_type,
+                "content_preview": None,
+                "created_at": entry[0],
+            }
+
+        self.index.add(key, now, user_id)
+        return None
+
+    async def cleanup_old_records(self) -> None:
+        """清理过期记录"""
+        self.index.expire(time.time())
+
+    def get_stats(self) -> dict:
+        """获取存储状态"""
+        return {"index_size": len(self.index)}
@@ -1,129 +1,787 @@
-import hashlib
+import asyncio
 import os
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
 import aiosqlite
 from astrbot.api import logger
+from .bloom_filter import TimeSlicedBloomFilter
+from .dedup_index import DedupIndex
+from .dedup_storage import DedupStorage
+from ..utils.constants import (
+    DATA_DIR,
+    DUPLICATE_CHECK_WINDOW,
+    DEDUP_INDEX_MAX_ENTRIES,
+    DB_FLUSH_INTERVAL_MS,
+    DB_FLUSH_BATCH_SIZE,
+    DB_PARTITION_HOURS,
+    DB_RECORD_RETENTION,
+    DB_CLEANUP_BATCH_SIZE,
+    BLOOM_SLICE_CAPACITY,
+    BLOOM_ERROR_RATE,
+)
 
 
-class MessageRecord:
-    """消息记录数据库模型"""
+class MessageRecord(DedupStorage):
+    """消息记录数据库模型（SQLite 存储后端）"""
 
-    def __init__(self, db_path: str = None):
+    # 当前数据库结构版本（保存在 PRAGMA user_version 中）
+    SCHEMA_VERSION = 6
+
+    # 分区表名前缀，完整表名为 message_records_p{起始时间戳}_{结束时间戳}
+    PARTITION_PREFIX = "message_records_p"
+
+    # 回查较早分区时每条 UNION ALL 语句包含的分区数，SQLite 默认最多 500 项
+    PARTITIONS_PER_QUERY = 100
+
+    # 连接建立后应用的 PRAGMA 设置
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-8000",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    # 按唯一键写入分区表：键不存在或已过期时写入新记录，否则累加命中次数
+    UPSERT_SQL = """
+        INSERT INTO {table}
+        (group_id, user_id, fingerprint, message_type, content_preview, created_at,
+            poster_id)
+        VALUES (:group_id, :user_id, :fingerprint, :message_type,
+            :content_preview, :created_at, :poster_id)
+        ON CONFLICT (group_id, user_id, fingerprint) DO UPDATE SET
+            hit_count = CASE WHEN created_at > :cutoff
+                THEN hit_count + 1 ELSE 1 END,
+            message_type = CASE WHEN created_at > :cutoff
+                THEN message_type ELSE excluded.message_type END,
+            content_preview = CASE WHEN created_at > :cutoff
+                THEN content_preview ELSE excluded.content_preview END,
+            created_at = CASE WHEN created_at > :cutoff
+                THEN created_at ELSE excluded.created_at END,
+            poster_id = CASE WHEN created_at > :cutoff
+                THEN poster_id ELSE excluded.poster_id END
+    """
+
+    def __init__(
+        self,
+        db_path: str = None,
+        index_max_entries: int = DEDUP_INDEX_MAX_ENTRIES,
+        flush_interval_ms: int = DB_FLUSH_INTERVAL_MS,
+        flush_batch_size: int = DB_FLUSH_BATCH_SIZE,
+        partition_hours: int = DB_PARTITION_HOURS,
+        window_hours: int = DUPLICATE_CHECK_WINDOW,
+        type_windows: Optional[Dict[str, int]] = None,
+        cleanup_batch_size: int = DB_CLEANUP_BATCH_SIZE,
+        bloom_capacity: int = BLOOM_SLICE_CAPACITY,
+        bloom_error_rate: float = BLOOM_ERROR_RATE,
+        scope: str = "user",
+        index: Optional[DedupIndex] = None,
+    ):
+        super().__init__(window_hours, type_windows, scope)
         if db_path is None:
-            db_dir = "data/plugins/banshi_administrator"
-            os.makedirs(db_dir, exist_ok=True)
-            db_path = os.path.join(db_dir, "message_records.db")
+            os.makedirs(DATA_DIR, exist_ok=True)
+            db_path = os.path.join(DATA_DIR, "message_records.db")
         self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+
+        # 记录在窗口结束后额外保留的时间
+        self.retention_margin = (DB_RECORD_RETENTION - DUPLICATE_CHECK_WINDOW) * 3600
+        self.cleanup_batch_size = max(1, cleanup_batch_size)
+        # 各类型已完成分批清理的时间点
+        self._cleaned_until: Dict[str, int] = {}
+
+        # 可传入多个实例共享的索引，使内存上限对所有实例生效
+        if index is None:
+            index = DedupIndex(self.max_window, index_max_entries)
+        self.index = index
+
+        # 每个群一个按小时分片的布隆过滤器，用于在回查数据库前排除新消息
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._blooms: Dict[int, TimeSlicedBloomFilter] = {}
+        self._bloom_ready = False
+        self._bloom_stats = {"negatives": 0, "positives": 0, "false_positives": 0}
+
+        # 延迟批量写入队列
+        self.flush_interval = max(1, flush_interval_ms) / 1000
+        self.flush_batch_size = max(1, flush_batch_size)
+        self._pending: List[dict] = []
+        self._pending_since: Optional[float] = None
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # 按时间分区的记录表，按起始时间排序的 (起始, 结束, 表名)
+        self.partition_span = max(1, partition_hours) * 3600
+        self._partitions: List[Tuple[int, int, str]] = []
+        self._partition_lock: Optional[asyncio.Lock] = None
+
+    async def _get_db(self) -> aiosqlite.Connection:
+        """获取长连接，首次使用时建立"""
+        if self._db is None:
+            db = await aiosqlite.connect(self.db_path)
+            for pragma in self.PRAGMAS:
+                await db.execute(pragma)
+            self._db = db
+        return self._db
+
+    async def close(self):
+        """写入剩余记录并关闭数据库连接"""
+        if self._flush_task and not self._flush_task.done():
+            # 通知后台任务退出。不直接取消：写入事件恰好触发时，
+            # wait_for 可能吞掉取消请求，导致任务一直运行、close 无法返回
+            self._closing = True
+            self._flush_event.set()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"写入剩余消息记录失败: {e}")
+
+        if self._db is not None:
+            db, self._db = self._db, None
+            try:
+                await db.close()
+            except Exception as e:
+                logger.error(f"关闭消息记录数据库失败: {e}")
 
     async def init_db(self):
-        """初始化数据库"""
-        async with aiosqlite.connect(self.db_path) as db:
-            # 创建消息记录表
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS message_records (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    group_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    message_hash TEXT NOT NULL,
-                    message_type TEXT NOT NULL,
-                    content_preview TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
+        """初始化数据库，必要时迁移到最新结构"""
+        db = await self._get_db()
+        version = await self._get_schema_version(db)
+        await self._load_partitions(db)
+
+        if version is not None and version < self.SCHEMA_VERSION:
+            migrations = {
+                1: self._migrate_to_v1,
+                2: self._migrate_to_v2,
+                3: self._migrate_to_v3,
+                4: self._migrate_to_v4,
+                5: self._migrate_to_v5,
+                6: self._migrate_to_v6,
+            }
+            for target in range(version + 1, self.SCHEMA_VERSION + 1):
+                await migrations[target](db)
+                await db.commit()
+                logger.info(f"消息记录数据库已迁移到版本 {target}")
+
+        await db.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        await db.commit()
+
+        if version is not None and version < self.SCHEMA_VERSION:
+            # 回收迁移释放的空间
+            await db.execute("VACUUM")
+
+        await self._warm_index()
+        await self._warm_bloom()
+
+        self._flush_event = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._flush_task = asyncio.create_task(self._flush_scheduler())
+
+    async def _get_schema_version(self, db: aiosqlite.Connection) -> Optional[int]:
+        """获取数据库结构版本，全新数据库返回 None"""
+        async with db.execute("PRAGMA user_version") as cursor:
+            version = (await cursor.fetchone())[0]
+        if version:
+            return version
+
+        # 引入版本号之前的数据库，根据表结构推断版本
+        async with db.execute("PRAGMA table_info(message_records)") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if not columns:
+            return None
+        return 1 if "hit_count" in columns else 0
+
+    async def _create_table(self, db: aiosqlite.Connection, table: str):
+        """创建消息记录表（各分区表结构相同）
+
+        以 (group_id, user_id, fingerprint) 为主键的 WITHOUT ROWID 表，
+        记录按主键聚簇存储，查重只需一次主键查找即可同时得到 created_at。
+        全群范围的记录 user_id 为 0，首发者记录在 poster_id 中。
+        """
+        await db.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                group_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                fingerprint BLOB NOT NULL,
+                created_at INTEGER NOT NULL,
+                message_type TEXT NOT NULL,
+                content_preview TEXT,
+                hit_count INTEGER NOT NULL DEFAULT 1,
+                poster_id INTEGER,
+                PRIMARY KEY (group_id, user_id, fingerprint)
+            ) WITHOUT ROWID
+        """
+        )
+        await self._create_cleanup_index(db, table)
+
+    async def _create_cleanup_index(self, db: aiosqlite.Connection, table: str):
+        """创建按类型和时间分批清理所用的索引，清理时无需扫描整个分区"""
+        await db.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_type_time "
+            f"ON {table} (message_type, created_at)"
+        )
+
+    async def _load_partitions(self, db: aiosqlite.Connection):
+        """加载已有的分区表"""
+        async with db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+            (f"{self.PARTITION_PREFIX}%",),
+        ) as cursor:
+            names = [row[0] for row in await cursor.fetchall()]
+
+        partitions = []
+        for name in names:
+            try:
+                start, end = name[len(self.PARTITION_PREFIX) :].split("_")
+                partitions.append((int(start), int(end), name))
+            except ValueError:
+                logger.warning(f"忽略无法识别的分区表: {name}")
+        self._partitions = sorted(partitions)
+
+    def _find_partition(self, ts: int) -> Optional[str]:
+        """查找包含指定时间的分区表"""
+        for start, end, name in self._partitions:
+            if start <= ts < end:
+                return name
+        return None
+
+    async def _ensure_partition(self, db: aiosqlite.Connection, ts: int) -> str:
+        """获取包含指定时间的分区表，不存在时创建"""
+        name = self._find_partition(ts)
+        if name is not None:
+            return name
+
+        if self._partition_lock is None:
+            self._partition_lock = asyncio.Lock()
+
+        async with self._partition_lock:
+            # 整点切换分区时多个查重会同时到达，等待期间分区可能已被创建
+            name = self._find_partition(ts)
+            if name is not None:
+                return name
+
+            # 按分区跨度对齐，并避免与已有分区（可能是旧的跨度）重叠
+            start = ts - ts % self.partition_span
+            end = start + self.partition_span
+            for other_start, other_end, _ in self._partitions:
+                if start < other_end <= ts:
+                    start = other_end
+                if ts < other_start < end:
+                    end = other_start
+
+            name = f"{self.PARTITION_PREFIX}{start}_{end}"
+            await self._create_table(db, name)
+            self._partitions.append((start, end, name))
+            self._partitions.sort()
+            return name
+
+    def _window_partitions(self, cutoff: int) -> List[str]:
+        """获取与时间窗口重叠的分区表，按时间从新到旧排列"""
+        return [name for _, end, name in reversed(self._partitions) if end > cutoff]
+
+    async def _migrate_to_v1(self, db: aiosqlite.Connection):
+        """版本 1：合并重复键并添加 hit_count 列"""
+        cursor = await db.execute(
             """
+            DELETE FROM message_records
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM message_records
+                GROUP BY group_id, user_id, message_hash
             )
+        """
+        )
+        await db.execute(
+            "ALTER TABLE message_records "
+            "ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 1"
+        )
+        await db.execute("DROP INDEX IF EXISTS idx_group_user_hash")
+        logger.info(f"合并了 {cursor.rowcount} 条重复的消息记录")
 
-            # 创建索引以提高查询效率
-            await db.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_group_user_hash
-                ON message_records (group_id, user_id, message_hash)
+    async def _migrate_to_v2(self, db: aiosqlite.Connection):
+        """版本 2：十六进制哈希改为定长 BLOB 指纹，时间改为整数时间戳"""
+        await db.execute("DROP TABLE IF EXISTS message_records_v2")
+        await db.execute(
             """
+            CREATE TABLE message_records_v2 (
+                id INTEGER PRIMARY KEY,
+                group_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                fingerprint BLOB NOT NULL,
+                message_type TEXT NOT NULL,
+                content_preview TEXT,
+                created_at INTEGER NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 1
             )
+        """
+        )
 
-            await db.execute(
-                """
-                CREATE INDEX IF NOT EXISTS idx_created_at
-                ON message_records (created_at)
+        async with db.execute(
             """
-            )
+            SELECT group_id, user_id, message_hash, message_type,
+                content_preview, CAST(strftime('%s', created_at) AS INTEGER),
+                hit_count
+            FROM message_records
+            ORDER BY id
+        """
+        ) as cursor:
+            while True:
+                rows = await cursor.fetchmany(5000)
+                if not rows:
+                    break
+                await db.executemany(
+                    """
+                    INSERT INTO message_records_v2
+                    (group_id, user_id, fingerprint, message_type,
+                        content_preview, created_at, hit_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                    [
+                        (
+                            row[0],
+                            row[1],
+                            bytes.fromhex(row[2])[:16],
+                            row[3],
+                            row[4],
+                            row[5] or 0,
+                            row[6],
+                        )
+                        for row in rows
+                    ],
+                )
 
-            await db.commit()
+        await db.execute("DROP TABLE message_records")
+        await db.execute("ALTER TABLE message_records_v2 RENAME TO message_records")
+        await db.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_message_key
+            ON message_records (group_id, user_id, fingerprint)
+        """
+        )
 
-    def _get_message_hash(self, content: str) -> str:
-        """生成消息内容的哈希值"""
-        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+    async def _migrate_to_v3(self, db: aiosqlite.Connection):
+        """版本 3：改为以唯一键为主键的 WITHOUT ROWID 表"""
+        await db.execute("DROP TABLE IF EXISTS message_records_v3")
+        await self._create_table(db, "message_records_v3")
+        await db.execute(
+            """
+            INSERT OR IGNORE INTO message_records_v3
+            (group_id, user_id, fingerprint, created_at, message_type,
+                content_preview, hit_count)
+            SELECT group_id, user_id, fingerprint, created_at, message_type,
+                content_preview, hit_count
+            FROM message_records
+        """
+        )
+        await db.execute("DROP TABLE message_records")
+        await db.execute("ALTER TABLE message_records_v3 RENAME TO message_records")
 
-    async def add_message_record(
-        self,
-        group_id: int,
-        user_id: int,
-        content: str,
-        message_type: str,
-        content_preview: str = "",
-    ):
-        """添加消息记录"""
-        message_hash = self._get_message_hash(content)
+    async def _migrate_to_v4(self, db: aiosqlite.Connection):
+        """版本 4：拆分为按时间分区的记录表，过期数据直接丢弃"""
+        cutoff = int(time.time()) - self.max_window - self.retention_margin
+        async with db.execute(
+            "SELECT DISTINCT created_at / ? FROM message_records WHERE created_at >= ?",
+            (self.partition_span, cutoff),
+        ) as cursor:
+            buckets = [row[0] for row in await cursor.fetchall()]
 
-        async with aiosqlite.connect(self.db_path) as db:
+        for bucket in buckets:
+            table = await self._ensure_partition(db, bucket * self.partition_span)
             await db.execute(
-                """
-                INSERT INTO message_records
-                (group_id, user_id, message_hash, message_type, content_preview)
-                VALUES (?, ?, ?, ?, ?)
+                f"""
+                INSERT OR IGNORE INTO {table}
+                (group_id, user_id, fingerprint, created_at, message_type,
+                    content_preview, hit_count)
+                SELECT group_id, user_id, fingerprint, created_at, message_type,
+                    content_preview, hit_count
+                FROM message_records
+                WHERE created_at >= ? AND created_at < ?
             """,
-                (group_id, user_id, message_hash, message_type, content_preview),
+                (bucket * self.partition_span, (bucket + 1) * self.partition_span),
             )
-            await db.commit()
 
-    async def check_duplicate_message(
-        self, group_id: int, user_id: int, content: str
-    ) -> Optional[dict]:
-        """检查是否为重复消息（24小时内同一用户）"""
-        message_hash = self._get_message_hash(content)
-        cutoff_time = datetime.now() - timedelta(hours=24)
+        await db.execute("DROP TABLE message_records")
+
+    async def _migrate_to_v5(self, db: aiosqlite.Connection):
+        """版本 5：添加首发者列，支持全群范围查重"""
+        for _, _, table in self._partitions:
+            async with db.execute(f"PRAGMA table_info({table})") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            if "poster_id" not in columns:
+                await db.execute(f"ALTER TABLE {table} ADD COLUMN poster_id INTEGER")
+
+    async def _migrate_to_v6(self, db: aiosqlite.Connection):
+        """版本 6：为已有分区添加 (message_type, created_at) 清理索引"""
+        for _, _, table in self._partitions:
+            await self._create_cleanup_index(db, table)
 
-        async with aiosqlite.connect(self.db_path) as db:
+    async def _warm_index(self):
+        """从数据库加载窗口内的记录预热内存索引"""
+        db = await self._get_db()
+        cutoff = int(time.time()) - self.max_window
+        rows = []
+        for table in self._window_partitions(cutoff):
+            remaining = self.index.max_entries - len(rows)
+            if remaining <= 0:
+                break
             async with db.execute(
-                """
-                SELECT message_type, content_preview, created_at
-                FROM message_records
-                WHERE group_id = ?
-                    AND user_id = ?
-                    AND message_hash = ?
-                    AND created_at > ?
+                f"""
+                SELECT group_id, user_id, fingerprint, created_at,
+                    COALESCE(poster_id, user_id)
+                FROM {table}
+                WHERE created_at > ?
                 ORDER BY created_at DESC
-                LIMIT 1
+                LIMIT ?
             """,
-                (group_id, user_id, message_hash, cutoff_time.isoformat()),
+                (cutoff, remaining),
             ) as cursor:
+                rows.extend(await cursor.fetchall())
+
+        for group_id, user_id, fingerprint, ts, poster_id in reversed(rows):
+            self.index.add((group_id, user_id, fingerprint), ts, poster_id)
+
+        complete = len(rows) < self.index.max_entries
+        self.index.mark_warmed(complete, rows[-1][3] if rows else 0.0)
+        logger.info(f"消息去重索引预热完成，加载 {len(rows)} 条记录")
+
+    async def _warm_bloom(self):
+        """从数据库加载窗口内的全部记录写入布隆过滤器"""
+        db = await self._get_db()
+        cutoff = int(time.time()) - self.max_window
+        count = 0
+        for table in self._window_partitions(cutoff):
+            async with db.execute(
+                f"""
+                SELECT group_id, user_id, fingerprint, created_at
+                FROM {table}
+                WHERE created_at > ?
+            """,
+                (cutoff,),
+            ) as cursor:
+                while True:
+                    rows = await cursor.fetchmany(5000)
+                    if not rows:
+                        break
+                    for group_id, user_id, fingerprint, ts in rows:
+                        self._get_bloom(group_id).add(fingerprint, ts, user_id)
+                    count += len(rows)
+            await asyncio.sleep(0)
+
+        self._bloom_ready = True
+        logger.info(f"布隆过滤器预热完成，加载 {count} 条记录")
+
+    def _get_bloom(self, group_id: int) -> TimeSlicedBloomFilter:
+        """获取群的布隆过滤器，不存在时创建"""
+        bloom = self._blooms.get(group_id)
+        if bloom is None:
+            bloom = TimeSlicedBloomFilter(
+                self.max_window,
+                capacity=self.bloom_capacity,
+                error_rate=self.bloom_error_rate,
+            )
+            self._blooms[group_id] = bloom
+        return bloom
+
+    def _remember(self, key: tuple, ts: int, poster_id: int):
+        """将记录写入内存索引和布隆过滤器"""
+        self.index.add(key, ts, poster_id)
+        group_id, user_id, fingerprint = key
+        self._get_bloom(group_id).add(fingerprint, ts, user_id)
+
+    def get_bloom_stats(self) -> dict:
+        """获取布隆过滤器的内存占用与误判率"""
+        stats = self._bloom_stats
+        truly_new = stats["negatives"] + stats["false_positives"]
+        return {
+            "groups": len(self._blooms),
+            "memory_bytes": sum(b.memory_bytes for b in self._blooms.values()),
+            "estimated_fp_rate": round(
+                max((b.estimated_fp_rate() for b in self._blooms.values()), default=0.0),
+                6,
+            ),
+            "observed_fp_rate": round(
+                stats["false_positives"] / truly_new if truly_new else 0.0, 6
+            ),
+            **stats,
+        }
+
+    @property
+    def pending_count(self) -> int:
+        """等待写入的记录数"""
+        return len(self._pending)
+
+    @property
+    def write_lag(self) -> float:
+        """最早一条待写入记录已等待的秒数"""
+        if self._pending_since is None:
+            return 0.0
+        return time.time() - self._pending_since
+
+    def get_stats(self) -> dict:
+        """获取写入队列状态"""
+        return {
+            "pending_count": self.pending_count,
+            "write_lag": round(self.write_lag, 3),
+            "index_size": len(self.index),
+            "partitions": len(self._partitions),
+            "bloom": self.get_bloom_stats(),
+        }
+
+    async def _flush_scheduler(self):
+        """按时间间隔或队列长度批量写入记录，close 时退出"""
+        while not self._closing:
+            try:
+                try:
+                    await asyncio.wait_for(
+                        self._flush_event.wait(), timeout=self.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                self._flush_event.clear()
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"批量写入消息记录时发生错误: {e}")
+
+    async def flush(self):
+        """将待写入的记录一次性提交到数据库"""
+        if not self._pending:
+            return
+
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            self._pending_since = None
+            if not batch:
+                return
+
+            db = await self._get_db()
+            try:
+                tables = defaultdict(list)
+                for params in batch:
+                    table = await self._ensure_partition(db, params["created_at"])
+                    tables[table].append(params)
+                for table, rows in tables.items():
+                    await db.executemany(self.UPSERT_SQL.format(table=table), rows)
+                await db.commit()
+            except Exception:
+                # 写入失败时放回队列，等待下次重试
+                self._pending = batch + self._pending
+                self._pending_since = time.time()
+                raise
+
+    async def check_and_record(
+        self,
+        group_id: int,
+        user_id: int,
+        fingerprint: bytes,
+        message_type: str,
+        content_preview: str = "",
+    ) -> Optional[dict]:
+        """
+        检查是否为重复消息（时间窗口内同一用户或全群），不重复时记录该消息
+
+        Returns:
+            Optional[dict]: 重复时返回首次发送的记录信息，否则返回 None
+        """
+        key = self.scope_key(group_id, user_id, fingerprint)
+        now = int(time.time())
+        window = self.get_window(message_type)
+
+        # 优先查询内存索引
+        entry = self.index.lookup(key, now, window)
+        if entry is not None:
+            return {
+                "user_id": entry[1],
+                "message_type": message_type,
+                "content_preview": None,
+                "created_at": entry[0],
+            }
+
+        authoritative = self.index.is_authoritative(now, window)
+        if not authoritative and self._bloom_ready:
+            # 布隆过滤器未命中可确定是新消息，无需回查数据库
+            bloom = self._get_bloom(group_id)
+            if bloom.might_contain(fingerprint, now, key[1], window):
+                self._bloom_stats["positives"] += 1
+            else:
+                self._bloom_stats["negatives"] += 1
+                authoritative = True
+
+        # 先在索引中占位，同一消息的并发副本会直接命中索引
+        self._remember(key, now, user_id)
+
+        params = {
+            "group_id": group_id,
+            "user_id": key[1],
+            "poster_id": user_id,
+            "fingerprint": fingerprint,
+            "message_type": message_type,
+            "content_preview": content_preview,
+            "created_at": now,
+            "cutoff": now - window,
+        }
+
+        if authoritative:
+            # 索引可确认为新消息，交给后台批量写入
+            self._pending.append(params)
+            if self._pending_since is None:
+                self._pending_since = now
+            if self._flush_event is None:
+                await self.flush()
+            elif len(self._pending) >= self.flush_batch_size:
+                self._flush_event.set()
+            return None
+
+        # 索引不完整时回查数据库，先写入队列中的记录以免漏查
+        if self._pending:
+            await self.flush()
+
+        # 先从新到旧分组查询窗口内较早的分区，命中即停止
+        db = await self._get_db()
+        table = await self._ensure_partition(db, now)
+        older = [t for t in self._window_partitions(params["cutoff"]) if t != table]
+        for offset in range(0, len(older), self.PARTITIONS_PER_QUERY):
+            sql = " UNION ALL ".join(
+                f"""
+                SELECT message_type, content_preview, created_at,
+                    COALESCE(poster_id, user_id) FROM {t}
+                WHERE group_id = :group_id AND user_id = :user_id
+                    AND fingerprint = :fingerprint AND created_at > :cutoff
+                """
+                for t in older[offset : offset + self.PARTITIONS_PER_QUERY]
+            )
+            async with db.execute(sql + " LIMIT 1", params) as cursor:
                 row = await cursor.fetchone()
+            if row:
+                self.index.add(key, row[2], row[3])
+                return {
+                    "user_id": row[3],
+                    "message_type": row[0],
+                    "content_preview": row[1],
+                    "created_at": row[2],
+                }
+
+        # 当前分区通过一次 upsert 完成查重与记录
+        sql = (
+            self.UPSERT_SQL.format(table=table)
+            + " RETURNING message_type, content_preview, created_at, hit_count,"
+            " COALESCE(poster_id, user_id)"
+        )
+        async with db.execute(sql, params) as cursor:
+            row = await cursor.fetchone()
+        await db.commit()
 
-                if row:
-                    return {
-                        "message_type": row[0],
-                        "content_preview": row[1],
-                        "created_at": row[2],
-                    }
+        if row and row[3] > 1:
+            self.index.add(key, row[2], row[4])
+            return {
+                "user_id": row[4],
+                "message_type": row[0],
+                "content_preview": row[1],
+                "created_at": row[2],
+            }
 
+        if self._bloom_ready:
+            self._bloom_stats["false_positives"] += 1
         return None
 
     async def cleanup_old_records(self):
-        """清理超过25小时的旧记录"""
-        cutoff_time = datetime.now() - timedelta(hours=25)
+        """清理过期记录
 
-        async with aiosqlite.connect(self.db_path) as db:
+        超出最长保留时间的分区整表删除；保留时间较短的消息类型在剩余分区中
+        分批删除，每批之间让出事件循环，避免阻塞查重。
+        """
+        now = int(time.time())
+        self.index.expire(now)
+        for group_id, bloom in list(self._blooms.items()):
+            bloom.rotate(now)
+            if not bloom.memory_bytes:
+                del self._blooms[group_id]
+        db = await self._get_db()
+
+        cutoff_time = now - self.max_window - self.retention_margin
+        expired = [p for p in self._partitions if p[1] <= cutoff_time]
+        for partition in expired:
+            await db.execute(f"DROP TABLE IF EXISTS {partition[2]}")
+            await db.commit()
+            self._partitions.remove(partition)
+            await asyncio.sleep(0)
+
+        deleted_count = 0
+        for name, condition, params, window in self._short_retention_rules():
+            cutoff = now - window - self.retention_margin
+            cleaned_until = self._cleaned_until.get(name, 0)
+            for start, end, table in list(self._partitions):
+                if start >= cutoff or end <= cleaned_until:
+                    continue
+                deleted_count += await self._delete_in_batches(
+                    db, table, condition, params, cutoff
+                )
+            self._cleaned_until[name] = cutoff
+
+        if expired:
+            logger.info(f"清理了 {len(expired)} 个过期的消息记录分区")
+        if deleted_count > 0:
+            logger.info(f"清理了 {deleted_count} 条过期的消息记录")
+
+    def _short_retention_rules(self) -> List[Tuple[str, str, tuple, int]]:
+        """获取窗口短于最长窗口的清理规则 (名称, 条件, 参数, 窗口)"""
+        rules = []
+        for message_type, window in self.type_windows.items():
+            if window < self.max_window:
+                rules.append((message_type, "message_type = ?", (message_type,), window))
+
+        if self.window_seconds < self.max_window:
+            # 等价于 message_type NOT IN (...)，改写为已配置类型之间的区间，
+            # 使清理索引可以按区间查找而不是每批扫描整个索引
+            types = sorted(self.type_windows)
+            ranges = ["message_type < ?"]
+            ranges += ["(message_type > ? AND message_type < ?)"] * (len(types) - 1)
+            ranges.append("message_type > ?")
+            bounds = [t for pair in zip(types, types[1:]) for t in pair]
+            params = (types[0], *bounds, types[-1])
+            rules.append(
+                ("*", f"({' OR '.join(ranges)})", params, self.window_seconds)
+            )
+        return rules
+
+    async def _delete_in_batches(
+        self,
+        db: aiosqlite.Connection,
+        table: str,
+        condition: str,
+        params: tuple,
+        cutoff: int,
+    ) -> int:
+        """分批删除分区中早于 cutoff 且满足条件的记录"""
+        deleted = 0
+        while True:
             cursor = await db.execute(
-                """
-                DELETE FROM message_records
-                WHERE created_at < ?
+                f"""
+                DELETE FROM {table}
+                WHERE (group_id, user_id, fingerprint) IN (
+                    SELECT group_id, user_id, fingerprint FROM {table}
+                    WHERE created_at < ? AND {condition}
+                    LIMIT ?
+                )
             """,
-                (cutoff_time.isoformat(),),
+                (cutoff, *params, self.cleanup_batch_size),
             )
-
-            deleted_count = cursor.rowcount
             await db.commit()
-
-            if deleted_count > 0:
-                logger.info(f"清理了 {deleted_count} 条过期的消息记录")
+            deleted += cursor.rowcount
+            await asyncio.sleep(0)
+            if cursor.rowcount < self.cleanup_batch_size:
+                return deleted
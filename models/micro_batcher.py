@@ -0,0 +1,79 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+
+class MicroBatcher:
+    """微批处理器
+
+    收集一段时间内（或达到数量上限前）提交的请求，合并为一次批量处理，
+    再把每一项的结果分别交给对应的等待者。
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_size: int,
+        max_wait_ms: int,
+    ):
+        self.process = process
+        self.max_size = max(1, max_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {"batches": 0, "items": 0}
+
+    async def submit(self, item: Any) -> Any:
+        """提交一项请求并等待其结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        """把当前收集的请求作为一批交给后台处理"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self._stats["batches"] += 1
+        self._stats["items"] += len(batch)
+        try:
+            results = await self.process([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        results = list(results or [])
+        for index, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(results[index] if index < len(results) else None)
+
+    async def close(self) -> None:
+        """处理剩余请求并等待进行中的批次完成"""
+        self._dispatch()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> dict:
+        """获取批次数量和平均批大小"""
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch_size": round(self._stats["items"] / batches, 2)
+            if batches
+            else 0.0,
+        }
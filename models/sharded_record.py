@@ -0,0 +1,166 @@
+import asyncio
+import os
+import re
+from typing import Dict, Optional
+from astrbot.api import logger
+from .dedup_index import DedupIndex
+from .dedup_storage import DedupStorage
+from .message_record import MessageRecord
+from ..utils.constants import DATA_DIR, DUPLICATE_CHECK_WINDOW, DEDUP_INDEX_MAX_ENTRIES
+
+
+class ShardedMessageRecord(DedupStorage):
+    """按群分片的消息记录，每个群一个 SQLite 文件，避免热点群争用同一写锁
+
+    各分片共享同一个内存索引，索引容量上限与分片数量无关。
+    """
+
+    SHARD_FILE_PATTERN = re.compile(r"^group_(-?\d+)\.db$")
+
+    def __init__(
+        self,
+        db_dir: str = None,
+        window_hours: int = DUPLICATE_CHECK_WINDOW,
+        type_windows: Optional[Dict[str, int]] = None,
+        scope: str = "user",
+        **record_options,
+    ):
+        super().__init__(window_hours, type_windows, scope)
+        if db_dir is None:
+            db_dir = os.path.join(DATA_DIR, "shards")
+        os.makedirs(db_dir, exist_ok=True)
+        self.db_dir = db_dir
+        self.index = DedupIndex(
+            self.max_window,
+            record_options.pop("index_max_entries", DEDUP_INDEX_MAX_ENTRIES),
+        )
+        self.record_options = {
+            "window_hours": window_hours,
+            "type_windows": type_windows,
+            "scope": scope,
+            "index": self.index,
+            **record_options,
+        }
+        self._shards: Dict[int, asyncio.Task] = {}
+
+    def _shard_path(self, group_id: int) -> str:
+        """获取群分片的数据库路径"""
+        return os.path.join(self.db_dir, f"group_{group_id}.db")
+
+    async def _open_shard(self, group_id: int) -> MessageRecord:
+        """创建并初始化群分片"""
+        record = MessageRecord(
+            db_path=self._shard_path(group_id), **self.record_options
+        )
+        await record.init_db()
+        return record
+
+    async def _get_shard(self, group_id: int) -> MessageRecord:
+        """获取群分片，首次使用时初始化，并发请求共享同一初始化任务"""
+        task = self._shards.get(group_id)
+        if task is None:
+            task = asyncio.create_task(self._open_shard(group_id))
+            self._shards[group_id] = task
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            self._shards.pop(group_id, None)
+            raise
+
+    async def _opened_shards(self) -> Dict[int, MessageRecord]:
+        """获取已成功初始化的分片"""
+        shards = {}
+        for group_id, task in list(self._shards.items()):
+            try:
+                shards[group_id] = await task
+            except Exception as e:
+                logger.error(f"群 {group_id} 的消息记录分片不可用: {e}")
+                self._shards.pop(group_id, None)
+        return shards
+
+    async def init_db(self) -> None:
+        """打开已有的群分片"""
+        for filename in os.listdir(self.db_dir):
+            match = self.SHARD_FILE_PATTERN.match(filename)
+            if match:
+                try:
+                    await self._get_shard(int(match.group(1)))
+                except Exception as e:
+                    logger.error(f"打开消息记录分片 {filename} 失败: {e}")
+        logger.info(f"已加载 {len(self._shards)} 个群的消息记录分片")
+
+    async def close(self) -> None:
+        """关闭所有分片"""
+        for record in (await self._opened_shards()).values():
+            await record.close()
+        self._shards.clear()
+
+    async def check_and_record(
+        self,
+        group_id: int,
+        user_id: int,
+        fingerprint: bytes,
+        message_type: str,
+        content_preview: str = "",
+    ) -> Optional[dict]:
+        """
+        检查是否为重复消息（时间窗口内同一用户或全群），不重复时记录该消息
+
+        Returns:
+            Optional[dict]: 重复时返回首次发送的记录信息，否则返回 None
+        """
+        record = await self._get_shard(group_id)
+        return await record.check_and_record(
+            group_id, user_id, fingerprint, message_type, content_preview
+        )
+
+    async def cleanup_old_records(self) -> None:
+        """逐个清理各分片的过期记录"""
+        for group_id, record in (await self._opened_shards()).items():
+            try:
+                await record.cleanup_old_records()
+            except Exception as e:
+                logger.error(f"清理群 {group_id} 的消息记录失败: {e}")
+
+    def get_stats(self) -> dict:
+        """汇总各分片的状态"""
+        stats = {
+            "shards": len(self._shards),
+            "pending_count": 0,
+            "write_lag": 0.0,
+            "index_size": len(self.index),
+            "partitions": 0,
+        }
+        bloom = {
+            "groups": 0,
+            "memory_bytes": 0,
+            "estimated_fp_rate": 0.0,
+            "negatives": 0,
+            "positives": 0,
+            "false_positives": 0,
+        }
+        for task in self._shards.values():
+            if not task.done() or task.cancelled() or task.exception():
+                continue
+            shard_stats = task.result().get_stats()
+            stats["pending_count"] += shard_stats["pending_count"]
+            stats["write_lag"] = max(stats["write_lag"], shard_stats["write_lag"])
+            stats["partitions"] += shard_stats["partitions"]
+            shard_bloom = shard_stats["bloom"]
+            for key in (
+                "groups",
+                "memory_bytes",
+                "negatives",
+                "positives",
+                "false_positives",
+            ):
+                bloom[key] += shard_bloom[key]
+            bloom["estimated_fp_rate"] = max(
+                bloom["estimated_fp_rate"], shard_bloom["estimated_fp_rate"]
+            )
+        truly_new = bloom["negatives"] + bloom["false_positives"]
+        bloom["observed_fp_rate"] = round(
+            bloom["false_positives"] / truly_new if truly_new else 0.0, 6
+        )
+        stats["bloom"] = bloom
+        return stats
@@ -0,0 +1,199 @@
+import asyncio
+import os
+import random
+import time
+from typing import Dict, Optional, Set, Tuple
+import aiosqlite
+from astrbot.api import logger
+from ..utils.constants import DATA_DIR
+
+# 计数在打包值中占用的位数
+_COUNT_BITS = 16
+_COUNT_MASK = (1 << _COUNT_BITS) - 1
+
+
+class TrustStore:
+    """用户信誉存储
+
+    按 (group_id, user_id) 记录历史判定中转发文案和纯聊天的次数，
+    两个计数打包为一个整数保存在内存中，定期把变化写入 SQLite。
+    转发文案占比达到阈值且判定次数足够的用户视为可信，其消息只按比例抽查。
+    判定为纯聊天时转发文案计数按 chat_penalty 成倍缩减，违规用户会很快失去信任。
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        min_observations: int,
+        sample_rate: float,
+        max_observations: int,
+        chat_penalty: int,
+        flush_interval: int,
+        db_path: str = None,
+    ):
+        self.threshold = threshold
+        self.min_observations = max(1, min_observations)
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self.max_observations = min(_COUNT_MASK, max(2, max_observations))
+        self.chat_penalty = max(1, chat_penalty)
+        self.flush_interval = max(1, flush_interval)
+        if db_path is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            db_path = os.path.join(DATA_DIR, "user_trust.db")
+        self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        # (group_id, user_id) -> 转发文案次数 << 16 | 纯聊天次数
+        self._entries: Dict[Tuple[str, str], int] = {}
+        self._dirty: Set[Tuple[str, str]] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._stats = {"skipped": 0, "sampled": 0}
+
+    @staticmethod
+    def _key(group_id, user_id) -> Tuple[str, str]:
+        return str(group_id), str(user_id)
+
+    async def init(self) -> None:
+        """加载已保存的信誉并启动定期写入"""
+        try:
+            self._db = await aiosqlite.connect(self.db_path)
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._db.execute("PRAGMA synchronous=NORMAL")
+            await self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS user_trust (
+                    group_id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    forward_count INTEGER NOT NULL,
+                    chat_count INTEGER NOT NULL,
+                    updated_at INTEGER NOT NULL,
+                    PRIMARY KEY (group_id, user_id)
+                ) WITHOUT ROWID
+            """
+            )
+            await self._db.commit()
+            async with self._db.execute(
+                "SELECT group_id, user_id, forward_count, chat_count FROM user_trust"
+            ) as cursor:
+                async for group_id, user_id, forward, chat in cursor:
+                    self._entries[(group_id, user_id)] = self._pack(forward, chat)
+            logger.info(f"用户信誉已加载: {len(self._entries)} 个用户")
+        except Exception as e:
+            logger.error(f"打开用户信誉数据库失败，仅在内存中记录: {e}")
+            self._db = None
+            return
+
+        self._flush_task = asyncio.create_task(self._flush_scheduler())
+
+    async def close(self) -> None:
+        """写入剩余变化并关闭数据库"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+        self._flush_task = None
+
+        await self.flush()
+
+        if self._db is not None:
+            db, self._db = self._db, None
+            try:
+                await db.close()
+            except Exception as e:
+                logger.error(f"关闭用户信誉数据库失败: {e}")
+
+    @staticmethod
+    def _pack(forward: int, chat: int) -> int:
+        return min(forward, _COUNT_MASK) << _COUNT_BITS | min(chat, _COUNT_MASK)
+
+    @staticmethod
+    def _unpack(packed: int) -> Tuple[int, int]:
+        return packed >> _COUNT_BITS, packed & _COUNT_MASK
+
+    def record(self, group_id, user_id, is_forward: bool) -> None:
+        """记录一次判定结果"""
+        key = self._key(group_id, user_id)
+        forward, chat = self._unpack(self._entries.get(key, 0))
+        if is_forward:
+            forward += 1
+        else:
+            chat += 1
+            forward //= self.chat_penalty
+        # 计数过大时减半，让近期的行为占更大比重
+        if forward + chat > self.max_observations:
+            forward, chat = (forward + 1) // 2, (chat + 1) // 2
+        self._entries[key] = self._pack(forward, chat)
+        self._dirty.add(key)
+
+    def get_trust(self, group_id, user_id) -> Optional[float]:
+        """获取转发文案占比，判定次数不足时返回 None"""
+        packed = self._entries.get(self._key(group_id, user_id))
+        if packed is None:
+            return None
+        forward, chat = self._unpack(packed)
+        if forward + chat < self.min_observations:
+            return None
+        return forward / (forward + chat)
+
+    def is_trusted(self, group_id, user_id) -> bool:
+        trust = self.get_trust(group_id, user_id)
+        return trust is not None and trust >= self.threshold
+
+    def should_skip(self, group_id, user_id) -> bool:
+        """可信用户的消息按抽查比例跳过检测"""
+        if not self.is_trusted(group_id, user_id):
+            return False
+        if random.random() < self.sample_rate:
+            self._stats["sampled"] += 1
+            return False
+        self._stats["skipped"] += 1
+        return True
+
+    async def _flush_scheduler(self) -> None:
+        """定期写入信誉变化"""
+        while True:
+            try:
+                await asyncio.sleep(self.flush_interval)
+                await self.flush()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"定期写入用户信誉时发生错误: {e}")
+
+    async def flush(self) -> None:
+        """把变化的信誉写入数据库"""
+        if self._db is None or not self._dirty:
+            return
+        keys, self._dirty = self._dirty, set()
+        now = int(time.time())
+        rows = []
+        for key in keys:
+            forward, chat = self._unpack(self._entries.get(key, 0))
+            rows.append((key[0], key[1], forward, chat, now))
+        try:
+            await self._db.executemany(
+                "INSERT OR REPLACE INTO user_trust "
+                "(group_id, user_id, forward_count, chat_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            await self._db.commit()
+        except Exception as e:
+            logger.error(f"写入用户信誉失败: {e}")
+            self._dirty.update(keys)
+
+    def get_stats(self) -> dict:
+        """获取可信用户数量和跳过的检测次数"""
+        trusted = 0
+        for packed in self._entries.values():
+            forward, chat = self._unpack(packed)
+            total = forward + chat
+            if total >= self.min_observations and forward >= self.threshold * total:
+                trusted += 1
+        return {
+            "users": len(self._entries),
+            "trusted": trusted,
+            "pending": len(self._dirty),
+            **self._stats,
+        }
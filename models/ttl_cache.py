@@ -0,0 +1,99 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """带过期时间的 LRU 缓存
+
+    超出容量时淘汰最久未使用的记录，读取时丢弃已过期的记录。
+    get_or_load 会把同一键的并发请求合并为一次加载。
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        # 键 -> (过期时间, 值)
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """读取未过期的值，不存在时返回 None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """写入值，超出容量时淘汰最久未使用的记录"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """清空缓存"""
+        self._entries.clear()
+
+    async def get_or_load(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Optional[Any]:
+        """
+        读取缓存，未命中时调用 loader 加载并缓存
+
+        同一键正在加载时等待该次加载的结果；加载结果为 None 时不缓存。
+        """
+        value = self.get(key)
+        if value is not None:
+            self._stats["hits"] += 1
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            return await asyncio.shield(future)
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+        finally:
+            self._inflight.pop(key, None)
+
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def get_stats(self) -> dict:
+        """获取缓存命中情况"""
+        requests = sum(self._stats.values())
+        return {
+            "size": len(self._entries),
+            "hit_rate": round(
+                (self._stats["hits"] + self._stats["coalesced"]) / requests
+                if requests
+                else 0.0,
+                4,
+            ),
+            **self._stats,
+        }
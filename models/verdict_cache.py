@@ -0,0 +1,176 @@
+import os
+import time
+import unicodedata
+from typing import Awaitable, Callable, List, Optional, Tuple
+import aiosqlite
+from astrbot.api import logger
+from .ttl_cache import TTLCache
+from ..utils.constants import DATA_DIR
+from ..utils.fingerprint import compute_fingerprint
+
+# 持久层中保存的原文长度上限，用于训练本地分类器
+SAMPLE_TEXT_LIMIT = 500
+
+
+class VerdictCache:
+    """LLM 判定结果缓存
+
+    以规范化文本的指纹为键，内存中保存最近的判定结果（LRU + 过期时间），
+    可选写入 SQLite 持久层，重启后仍然有效。相同文本的并发请求只调用一次 LLM。
+    持久层同时保存截断的原文，作为本地分类器的训练样本。
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: int,
+        persist: bool = True,
+        db_path: str = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._memory = TTLCache(max_entries, ttl_seconds)
+        self.persist = persist
+        if persist and db_path is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            db_path = os.path.join(DATA_DIR, "llm_verdicts.db")
+        self.db_path = db_path
+        self._db: Optional[aiosqlite.Connection] = None
+        self._stats = {"db_hits": 0, "llm_calls": 0}
+
+    @staticmethod
+    def make_key(text: str) -> bytes:
+        """规范化文本并计算指纹，忽略大小写、全半角、空白和标点的差异"""
+        text = unicodedata.normalize("NFKC", text).lower()
+        return compute_fingerprint(
+            "verdict:" + "".join(char for char in text if char.isalnum())
+        )
+
+    async def init(self) -> None:
+        """打开持久层并清理过期的判定"""
+        if not self.persist:
+            return
+        try:
+            self._db = await aiosqlite.connect(self.db_path)
+            await self._db.execute("PRAGMA journal_mode=WAL")
+            await self._db.execute("PRAGMA synchronous=NORMAL")
+            await self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_verdicts (
+                    fingerprint BLOB PRIMARY KEY,
+                    verdict INTEGER NOT NULL,
+                    created_at INTEGER NOT NULL,
+                    text TEXT
+                ) WITHOUT ROWID
+            """
+            )
+            # 旧版本的表没有原文列
+            async with self._db.execute("PRAGMA table_info(llm_verdicts)") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            if "text" not in columns:
+                await self._db.execute("ALTER TABLE llm_verdicts ADD COLUMN text TEXT")
+            cursor = await self._db.execute(
+                "DELETE FROM llm_verdicts WHERE created_at <= ?",
+                (int(time.time()) - self.ttl_seconds,),
+            )
+            await self._db.commit()
+            logger.info(f"LLM 判定缓存已加载，清理过期判定 {cursor.rowcount} 条")
+        except Exception as e:
+            logger.error(f"打开 LLM 判定缓存数据库失败，仅使用内存缓存: {e}")
+            self._db = None
+
+    async def close(self) -> None:
+        """关闭持久层"""
+        if self._db is not None:
+            db, self._db = self._db, None
+            try:
+                await db.close()
+            except Exception as e:
+                logger.error(f"关闭 LLM 判定缓存数据库失败: {e}")
+
+    async def get_or_classify(
+        self, text: str, classify: Callable[[], Awaitable[Optional[bool]]]
+    ) -> Optional[bool]:
+        """
+        获取文本的判定结果，未缓存时调用 classify
+
+        classify 返回 None 表示判定失败，失败结果不缓存。
+        """
+        key = self.make_key(text)
+        return await self._memory.get_or_load(
+            key, lambda: self._load(key, text, classify)
+        )
+
+    async def _load(
+        self,
+        key: bytes,
+        text: str,
+        classify: Callable[[], Awaitable[Optional[bool]]],
+    ) -> Optional[bool]:
+        """依次查询持久层和 LLM"""
+        verdict = await self._read(key)
+        if verdict is not None:
+            self._stats["db_hits"] += 1
+            return verdict
+
+        self._stats["llm_calls"] += 1
+        verdict = await classify()
+        if verdict is not None:
+            await self._write(key, text, verdict)
+        return verdict
+
+    async def _read(self, key: bytes) -> Optional[bool]:
+        if self._db is None:
+            return None
+        try:
+            async with self._db.execute(
+                "SELECT verdict FROM llm_verdicts "
+                "WHERE fingerprint = ? AND created_at > ?",
+                (key, int(time.time()) - self.ttl_seconds),
+            ) as cursor:
+                row = await cursor.fetchone()
+            return bool(row[0]) if row else None
+        except Exception as e:
+            logger.error(f"读取 LLM 判定缓存失败: {e}")
+            return None
+
+    async def _write(self, key: bytes, text: str, verdict: bool) -> None:
+        if self._db is None:
+            return
+        try:
+            await self._db.execute(
+                "INSERT OR REPLACE INTO llm_verdicts "
+                "(fingerprint, verdict, created_at, text) VALUES (?, ?, ?, ?)",
+                (key, int(verdict), int(time.time()), text[:SAMPLE_TEXT_LIMIT]),
+            )
+            await self._db.commit()
+        except Exception as e:
+            logger.error(f"写入 LLM 判定缓存失败: {e}")
+
+    async def load_samples(self, limit: int) -> List[Tuple[str, bool]]:
+        """读取最近的 (原文, 判定) 样本，用于训练本地分类器"""
+        if self._db is None:
+            return []
+        try:
+            async with self._db.execute(
+                "SELECT text, verdict FROM llm_verdicts WHERE text IS NOT NULL "
+                "ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ) as cursor:
+                return [(row[0], bool(row[1])) for row in await cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"读取 LLM 判定样本失败: {e}")
+            return []
+
+    def get_stats(self) -> dict:
+        """获取命中率和节省的 LLM 调用次数"""
+        memory = self._memory.get_stats()
+        requests = memory["hits"] + memory["coalesced"] + memory["misses"]
+        saved = requests - self._stats["llm_calls"]
+        return {
+            "size": memory["size"],
+            "memory_hits": memory["hits"] + memory["coalesced"],
+            "db_hits": self._stats["db_hits"],
+            "llm_calls": self._stats["llm_calls"],
+            "calls_saved": saved,
+            "hit_rate": round(saved / requests if requests else 0.0, 4),
+        }
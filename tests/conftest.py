@@ -0,0 +1,19 @@
+"""测试公共配置：把插件目录注册为可导入的包"""
+
+import importlib
+import os
+import sys
+
+import pytest
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if os.path.dirname(PLUGIN_DIR) not in sys.path:
+    sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+PLUGIN = os.path.basename(PLUGIN_DIR)
+
+
+@pytest.fixture
+def plugin_module():
+    """按插件内的模块路径导入，未安装 astrbot 时跳过"""
+    pytest.importorskip("astrbot")
+    return lambda name: importlib.import_module(f"{PLUGIN}.{name}")
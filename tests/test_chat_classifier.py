@@ -0,0 +1,56 @@
+"""本地文案分类器端到端训练测试"""
+
+import asyncio
+import os
+import random
+
+CHAT_WORDS = ["你们", "晚饭", "吃", "什么", "呀", "今天", "下班", "好累"]
+FORWARD_WORDS = ["人生", "就像", "一杯茶", "努力", "才会", "成功", "转发", "鸡汤"]
+
+
+class FakeAdministrator:
+    platform = None
+    context = None
+
+
+def make_text(rng, words, index):
+    return "".join(rng.choice(words) for _ in range(12)) + str(index)
+
+
+def test_manager_init_trains_local_classifier(tmp_path, monkeypatch, plugin_module):
+    """已有足够的 LLM 判定时，DetectorManager 启动即训练并保存本地分类器"""
+    monkeypatch.chdir(tmp_path)
+    VerdictCache = plugin_module("models").VerdictCache
+    DetectorManager = plugin_module("core.manager").DetectorManager
+    constants = plugin_module("utils.constants")
+    data_dir = tmp_path / constants.DATA_DIR
+
+    async def run():
+        rng = random.Random(1)
+        cache = VerdictCache(100, 3600)
+        await cache.init()
+        for index in range(constants.LOCAL_CLASSIFIER_MIN_SAMPLES + 100):
+            is_forward = index % 2 == 0
+            text = make_text(rng, FORWARD_WORDS if is_forward else CHAT_WORDS, index)
+
+            async def classify(verdict=is_forward):
+                return verdict
+
+            await cache.get_or_classify(text, classify)
+        await cache.close()
+
+        manager = DetectorManager(FakeAdministrator(), {})
+        await manager.init_all()
+        try:
+            classifier = manager.chat_detector.local_classifier
+            stats = manager.get_stats()["chat"]["local_classifier"]
+            forward = classifier.predict("人生就像一杯茶努力才会成功", 0.5)
+        finally:
+            await manager.stop_all()
+        return classifier, stats, forward
+
+    classifier, stats, forward = asyncio.run(run())
+    assert classifier is not None and classifier.trained
+    assert stats["trained"]
+    assert forward is True
+    assert os.path.exists(data_dir / "chat_classifier.json")
@@ -0,0 +1,317 @@
+"""消息记录数据库迁移与索引回退路径测试"""
+
+import asyncio
+import hashlib
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+
+@pytest.fixture
+def models(plugin_module):
+    return plugin_module("models")
+
+
+@pytest.fixture
+def compute_fingerprint(plugin_module):
+    return plugin_module("utils.fingerprint").compute_fingerprint
+
+
+def create_legacy_db(db_path, rows):
+    """按引入版本号之前的表结构建库，rows 为 (group_id, user_id, 内容, 距今小时数)"""
+    with sqlite3.connect(db_path) as db:
+        db.execute(
+            """
+            CREATE TABLE message_records (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                message_hash TEXT NOT NULL,
+                message_type TEXT NOT NULL,
+                content_preview TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """
+        )
+        db.execute(
+            "CREATE INDEX idx_group_user_hash "
+            "ON message_records (group_id, user_id, message_hash)"
+        )
+        now = datetime.now(timezone.utc)
+        db.executemany(
+            """
+            INSERT INTO message_records
+            (group_id, user_id, message_hash, message_type, content_preview,
+                created_at)
+            VALUES (?, ?, ?, 'text', ?, ?)
+        """,
+            [
+                (
+                    group_id,
+                    user_id,
+                    hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                    content[:20],
+                    (now - timedelta(hours=hours)).strftime("%Y-%m-%d %H:%M:%S"),
+                )
+                for group_id, user_id, content, hours in rows
+            ],
+        )
+
+
+@pytest.mark.parametrize("index_max_entries", [100, 1])
+def test_legacy_rows_match_after_migration(
+    tmp_path, models, compute_fingerprint, index_max_entries
+):
+    db_path = str(tmp_path / "message_records.db")
+    create_legacy_db(
+        db_path,
+        [
+            (1, 10, "旧消息", 3),
+            (1, 10, "旧消息", 2),
+            (1, 11, "另一条旧消息", 1),
+            (2, 10, "过期消息", 30),
+        ],
+    )
+
+    async def run():
+        record = models.MessageRecord(
+            db_path=db_path, index_max_entries=index_max_entries
+        )
+        await record.init_db()
+        try:
+            old = await record.check_and_record(
+                1, 10, compute_fingerprint("旧消息"), "text"
+            )
+            other = await record.check_and_record(
+                1, 11, compute_fingerprint("另一条旧消息"), "text"
+            )
+            other_user = await record.check_and_record(
+                1, 12, compute_fingerprint("旧消息"), "text"
+            )
+            expired = await record.check_and_record(
+                2, 10, compute_fingerprint("过期消息"), "text"
+            )
+        finally:
+            await record.close()
+        return old, other, other_user, expired
+
+    old, other, other_user, expired = asyncio.run(run())
+    assert old is not None and old["user_id"] == 10
+    assert other is not None and other["user_id"] == 11
+    assert other_user is None
+    assert expired is None
+
+    with sqlite3.connect(db_path) as db:
+        version = db.execute("PRAGMA user_version").fetchone()[0]
+        tables = {
+            row[0]
+            for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        }
+    assert version == models.MessageRecord.SCHEMA_VERSION
+    assert "message_records" not in tables
+
+
+def test_evicted_entry_falls_back_to_database(tmp_path, models, compute_fingerprint):
+    """索引容量不足淘汰记录后，查重回退到布隆过滤器和数据库"""
+    db_path = str(tmp_path / "message_records.db")
+
+    async def run():
+        record = models.MessageRecord(db_path=db_path, index_max_entries=2)
+        await record.init_db()
+        try:
+            for content in ("a", "b", "c"):
+                assert (
+                    await record.check_and_record(
+                        1, 10, compute_fingerprint(content), "text"
+                    )
+                    is None
+                )
+            evicted = await record.check_and_record(
+                1, 10, compute_fingerprint("a"), "text"
+            )
+            fresh = await record.check_and_record(
+                1, 10, compute_fingerprint("d"), "text"
+            )
+            stats = record.get_stats()
+        finally:
+            await record.close()
+        return evicted, fresh, stats
+
+    evicted, fresh, stats = asyncio.run(run())
+    assert evicted is not None and evicted["user_id"] == 10
+    assert fresh is None
+    assert stats["index_size"] == 2
+    assert stats["bloom"]["positives"] >= 1
+    assert stats["bloom"]["negatives"] >= 1
+
+
+def test_incomplete_warm_up_checks_database(tmp_path, models, compute_fingerprint):
+    """重启后索引只预热了部分记录，较早的记录仍能从数据库查到"""
+    db_path = str(tmp_path / "message_records.db")
+    contents = [f"消息{i}" for i in range(5)]
+
+    async def run():
+        record = models.MessageRecord(db_path=db_path, index_max_entries=100)
+        await record.init_db()
+        for content in contents:
+            await record.check_and_record(1, 10, compute_fingerprint(content), "text")
+        await record.close()
+
+        record = models.MessageRecord(db_path=db_path, index_max_entries=2)
+        await record.init_db()
+        try:
+            results = [
+                await record.check_and_record(
+                    1, 10, compute_fingerprint(content), "text"
+                )
+                for content in contents
+            ]
+            fresh = await record.check_and_record(
+                1, 10, compute_fingerprint("新消息"), "text"
+            )
+        finally:
+            await record.close()
+        return results, fresh
+
+    results, fresh = asyncio.run(run())
+    assert all(result is not None for result in results)
+    assert fresh is None
+
+
+def test_group_scope_upsert_keeps_first_poster(tmp_path, models, compute_fingerprint):
+    """全群范围下索引未命中时，upsert 返回首发者"""
+    db_path = str(tmp_path / "message_records.db")
+
+    async def run():
+        record = models.MessageRecord(
+            db_path=db_path, index_max_entries=1, scope="group"
+        )
+        await record.init_db()
+        try:
+            await record.check_and_record(1, 10, compute_fingerprint("广告"), "text")
+            await record.check_and_record(1, 11, compute_fingerprint("其他"), "text")
+            return await record.check_and_record(
+                1, 12, compute_fingerprint("广告"), "text"
+            )
+        finally:
+            await record.close()
+
+    result = asyncio.run(run())
+    assert result is not None and result["user_id"] == 10
+
+
+def test_fallback_spans_more_partitions_than_compound_limit(
+    tmp_path, monkeypatch, models, compute_fingerprint
+):
+    """窗口覆盖超过 500 个分区时，回查数据库仍能找到最早分区中的记录"""
+    db_path = str(tmp_path / "message_records.db")
+    module = models.message_record
+    real_time = module.time.time
+    now = int(real_time())
+    hours = 600
+
+    async def run():
+        record = models.MessageRecord(
+            db_path=db_path, type_windows={"image": hours + 24}
+        )
+        await record.init_db()
+        for hour in range(hours, 0, -1):
+            monkeypatch.setattr(module.time, "time", lambda: now - hour * 3600)
+            await record.check_and_record(
+                1, 10, compute_fingerprint(f"图片{hour}"), "image"
+            )
+        await record.close()
+        monkeypatch.setattr(module.time, "time", real_time)
+
+        record = models.MessageRecord(
+            db_path=db_path, index_max_entries=1, type_windows={"image": hours + 24}
+        )
+        await record.init_db()
+        try:
+            partitions = len(record._partitions)
+            oldest = await record.check_and_record(
+                1, 10, compute_fingerprint(f"图片{hours}"), "image"
+            )
+        finally:
+            await record.close()
+        return partitions, oldest
+
+    partitions, oldest = asyncio.run(run())
+    assert partitions >= hours
+    assert oldest is not None and oldest["user_id"] == 10
+
+
+def test_concurrent_checks_create_partition_once(tmp_path, models, compute_fingerprint):
+    """同时回查数据库的多条消息只创建一次当前分区"""
+    db_path = str(tmp_path / "message_records.db")
+
+    async def run():
+        record = models.MessageRecord(db_path=db_path, index_max_entries=1)
+        await record.init_db()
+        try:
+            # 让索引不完整，所有查重都回查数据库并确保当前分区存在
+            record.index.mark_warmed(False, float("inf"))
+            record._bloom_ready = False
+            await asyncio.gather(
+                *(
+                    record.check_and_record(
+                        1, user_id, compute_fingerprint("消息"), "text"
+                    )
+                    for user_id in range(8)
+                )
+            )
+            return [name for _, _, name in record._partitions]
+        finally:
+            await record.close()
+
+    names = asyncio.run(run())
+    assert len(names) == len(set(names)) == 1
+
+
+def test_cleanup_deletes_expired_types_through_index(
+    tmp_path, monkeypatch, models, compute_fingerprint
+):
+    """按类型清理只删除窗口已过的记录，分区带有清理索引"""
+    db_path = str(tmp_path / "message_records.db")
+    module = models.message_record
+    real_time = module.time.time
+    now = int(real_time())
+
+    async def run():
+        record = models.MessageRecord(
+            db_path=db_path, type_windows={"image": 168, "video": 48}
+        )
+        await record.init_db()
+        monkeypatch.setattr(module.time, "time", lambda: now - 30 * 3600)
+        for message_type in ("audio", "image", "text", "video"):
+            await record.check_and_record(
+                1, 10, compute_fingerprint(message_type), message_type
+            )
+        await record.flush()
+        monkeypatch.setattr(module.time, "time", real_time)
+        await record.cleanup_old_records()
+        await record.close()
+
+    asyncio.run(run())
+    with sqlite3.connect(db_path) as db:
+        tables = [
+            row[0]
+            for row in db.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+                (f"{models.MessageRecord.PARTITION_PREFIX}%",),
+            )
+        ]
+        remaining = sorted(
+            row[0]
+            for table in tables
+            for row in db.execute(f"SELECT message_type FROM {table}")
+        )
+        indexes = {
+            row[0]
+            for row in db.execute(
+                "SELECT tbl_name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+    assert remaining == ["image", "video"]
+    assert set(tables) <= indexes
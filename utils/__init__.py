@@ -1,27 +1,138 @@
 """工具模块"""
 
 from .constants import (
+    DATA_DIR,
     BAN_DURATIONS,
     MESSAGE_TYPE_NAMES,
     WARNING_RECALL_DELAY,
     DB_CLEANUP_INTERVAL,
+    STATS_LOG_INTERVAL,
     DUPLICATE_CHECK_WINDOW,
     DB_RECORD_RETENTION,
+    DEDUP_INDEX_MAX_ENTRIES,
+    DB_FLUSH_INTERVAL_MS,
+    DB_FLUSH_BATCH_SIZE,
+    DB_PARTITION_HOURS,
+    DB_CLEANUP_BATCH_SIZE,
+    BLOOM_SLICE_CAPACITY,
+    BLOOM_ERROR_RATE,
+    NEAR_DUPLICATE_MAX_DISTANCE,
+    NEAR_DUPLICATE_MIN_LENGTH,
+    NEAR_DUPLICATE_MAX_ENTRIES,
+    CROSS_GROUP_WINDOW,
+    CROSS_GROUP_MIN_LENGTH,
+    CROSS_GROUP_INDEX_MAX_ENTRIES,
+    IMAGE_HASH_MAX_DISTANCE,
+    IMAGE_HASH_WORKERS,
+    IMAGE_HASH_CACHE_SIZE,
+    FORWARD_CACHE_SIZE,
+    FORWARD_CACHE_TTL,
+    FORWARD_MAX_NODES,
+    FORWARD_MAX_BYTES,
+    FORWARD_MAX_DEPTH,
+    FORWARD_FETCH_CONCURRENCY,
+    LLM_VERDICT_CACHE_SIZE,
+    LLM_VERDICT_CACHE_TTL,
+    LLM_BATCH_SIZE,
+    LLM_BATCH_WAIT_MS,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_PENDING,
+    LLM_TIMEOUT,
+    LLM_BREAKER_THRESHOLD,
+    LLM_BREAKER_COOLDOWN,
+    LOCAL_CLASSIFIER_CONFIDENCE,
+    LOCAL_CLASSIFIER_MIN_SAMPLES,
+    LOCAL_CLASSIFIER_MAX_SAMPLES,
+    LOCAL_CLASSIFIER_RETRAIN_INTERVAL,
+    TRUST_THRESHOLD,
+    TRUST_MIN_OBSERVATIONS,
+    TRUST_SAMPLE_RATE,
+    TRUST_MAX_OBSERVATIONS,
+    TRUST_CHAT_PENALTY,
+    TRUST_FLUSH_INTERVAL,
+    AD_KEYWORDS,
+    AD_CARD_INDICATORS,
     DEFAULT_BAN_DURATION,
 )
 from .rules import AdminRules
 from .helpers import safe_int, safe_str, truncate_text
+from .fingerprint import (
+    FINGERPRINT_SIZE,
+    StreamingFingerprint,
+    combine_fingerprints,
+    compute_fingerprint,
+)
+from .simhash import SimHashBuilder, hamming_distance, simhash
+from .image_hash import compute_dhash
+from .media_identity import normalize_media_id
+from .keyword_matcher import AhoCorasick, KeywordMatcher
 
 __all__ = [
     "AdminRules",
+    "DATA_DIR",
     "BAN_DURATIONS",
     "MESSAGE_TYPE_NAMES",
     "WARNING_RECALL_DELAY",
     "DB_CLEANUP_INTERVAL",
+    "STATS_LOG_INTERVAL",
     "DUPLICATE_CHECK_WINDOW",
     "DB_RECORD_RETENTION",
+    "DEDUP_INDEX_MAX_ENTRIES",
+    "DB_FLUSH_INTERVAL_MS",
+    "DB_FLUSH_BATCH_SIZE",
+    "DB_PARTITION_HOURS",
+    "DB_CLEANUP_BATCH_SIZE",
+    "BLOOM_SLICE_CAPACITY",
+    "BLOOM_ERROR_RATE",
+    "NEAR_DUPLICATE_MAX_DISTANCE",
+    "NEAR_DUPLICATE_MIN_LENGTH",
+    "NEAR_DUPLICATE_MAX_ENTRIES",
+    "CROSS_GROUP_WINDOW",
+    "CROSS_GROUP_MIN_LENGTH",
+    "CROSS_GROUP_INDEX_MAX_ENTRIES",
+    "IMAGE_HASH_MAX_DISTANCE",
+    "IMAGE_HASH_WORKERS",
+    "IMAGE_HASH_CACHE_SIZE",
+    "FORWARD_CACHE_SIZE",
+    "FORWARD_CACHE_TTL",
+    "FORWARD_MAX_NODES",
+    "FORWARD_MAX_BYTES",
+    "FORWARD_MAX_DEPTH",
+    "FORWARD_FETCH_CONCURRENCY",
+    "LLM_VERDICT_CACHE_SIZE",
+    "LLM_VERDICT_CACHE_TTL",
+    "LLM_BATCH_SIZE",
+    "LLM_BATCH_WAIT_MS",
+    "LLM_MAX_CONCURRENCY",
+    "LLM_MAX_PENDING",
+    "LLM_TIMEOUT",
+    "LLM_BREAKER_THRESHOLD",
+    "LLM_BREAKER_COOLDOWN",
+    "LOCAL_CLASSIFIER_CONFIDENCE",
+    "LOCAL_CLASSIFIER_MIN_SAMPLES",
+    "LOCAL_CLASSIFIER_MAX_SAMPLES",
+    "LOCAL_CLASSIFIER_RETRAIN_INTERVAL",
+    "TRUST_THRESHOLD",
+    "TRUST_MIN_OBSERVATIONS",
+    "TRUST_SAMPLE_RATE",
+    "TRUST_MAX_OBSERVATIONS",
+    "TRUST_CHAT_PENALTY",
+    "TRUST_FLUSH_INTERVAL",
+    "AD_KEYWORDS",
+    "AD_CARD_INDICATORS",
     "DEFAULT_BAN_DURATION",
     "safe_int",
     "safe_str",
     "truncate_text",
+    "FINGERPRINT_SIZE",
+    "StreamingFingerprint",
+    "combine_fingerprints",
+    "compute_fingerprint",
+    "SimHashBuilder",
+    "hamming_distance",
+    "simhash",
+    "compute_dhash",
+    "normalize_media_id",
+    "AhoCorasick",
+    "KeywordMatcher",
 ]
@@ -0,0 +1,68 @@
+"""评估本地文案分类器
+
+从 LLM 判定缓存数据库读取样本，按文本哈希划分训练集和测试集，
+报告不同置信度下本地分类器与 LLM 判定的一致率以及可省去的 LLM 调用比例。
+
+用法（在插件目录下执行）:
+    python -m utils.classifier_eval data/plugins/banshi_administrator/llm_verdicts.db
+"""
+
+import argparse
+import sqlite3
+import time
+
+from .text_classifier import NaiveBayesClassifier, evaluate, split_samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="评估本地文案分类器")
+    parser.add_argument("db_path", help="llm_verdicts.db 的路径")
+    parser.add_argument(
+        "--confidence",
+        type=float,
+        nargs="+",
+        default=[0.8, 0.9, 0.95, 0.99],
+        help="要评估的置信度",
+    )
+    parser.add_argument("--test-ratio", type=float, default=0.2, help="测试集比例")
+    args = parser.parse_args()
+
+    with sqlite3.connect(args.db_path) as db:
+        samples = [
+            (text, bool(verdict))
+            for text, verdict in db.execute(
+                "SELECT text, verdict FROM llm_verdicts WHERE text IS NOT NULL"
+            )
+        ]
+    train, test = split_samples(samples, args.test_ratio)
+    print(f"样本 {len(samples)} 条：训练 {len(train)} 条，测试 {len(test)} 条")
+    if not train or not test:
+        print("样本不足，无法评估")
+        return
+
+    classifier = NaiveBayesClassifier()
+    start = time.perf_counter()
+    classifier.train(train)
+    print(f"训练耗时 {time.perf_counter() - start:.2f} 秒")
+    if not classifier.trained:
+        print("训练样本只有一类判定，无法评估")
+        return
+
+    start = time.perf_counter()
+    for text, _ in test:
+        classifier.predict_proba(text)
+    per_message = (time.perf_counter() - start) / len(test) * 1e6
+    print(f"平均每条消息判定耗时 {per_message:.1f} 微秒")
+
+    print("置信度  覆盖率  一致率  省去调用  误判为文案  误判为聊天")
+    for confidence in args.confidence:
+        result = evaluate(classifier, test, confidence)
+        print(
+            f"{confidence:<8.2f}{result['covered']:<8.2%}{result['agreement']:<8.2%}"
+            f"{result['calls_avoided']:<10}{result['false_forward']:<12}"
+            f"{result['false_chat']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
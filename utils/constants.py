@@ -1,5 +1,8 @@
 """常量定义"""
 
+# 插件数据目录（相对于 AstrBot 工作目录）
+DATA_DIR = "data/plugins/banshi_administrator"
+
 # 禁言时长（秒）
 BAN_DURATIONS = {
     "text": 600,  # 文本重复：10分钟
@@ -34,11 +37,163 @@ WARNING_RECALL_DELAY = 60
 # 数据库清理间隔（秒）
 DB_CLEANUP_INTERVAL = 3600
 
+# 运行指标写入日志的间隔（秒）
+STATS_LOG_INTERVAL = 3600
+
 # 重复消息检测时间窗口（小时）
 DUPLICATE_CHECK_WINDOW = 24
 
 # 数据库记录保留时间（小时）
 DB_RECORD_RETENTION = 25
 
+# 内存去重索引最大记录数
+DEDUP_INDEX_MAX_ENTRIES = 100000
+
+# 消息记录批量写入间隔（毫秒）
+DB_FLUSH_INTERVAL_MS = 500
+
+# 消息记录批量写入的最大条数
+DB_FLUSH_BATCH_SIZE = 200
+
+# 消息记录分区表的时间跨度（小时）
+DB_PARTITION_HOURS = 1
+
+# 分批清理过期记录时每批删除的条数
+DB_CLEANUP_BATCH_SIZE = 500
+
+# 布隆过滤器每个群每小时分片的预期记录数
+BLOOM_SLICE_CAPACITY = 10000
+
+# 布隆过滤器目标误判率
+BLOOM_ERROR_RATE = 0.01
+
+# 近似重复判定的最大汉明距离
+NEAR_DUPLICATE_MAX_DISTANCE = 3
+
+# 参与近似重复检测的最短有效字符数
+NEAR_DUPLICATE_MIN_LENGTH = 20
+
+# 近似重复索引每个群的最大记录数
+NEAR_DUPLICATE_MAX_ENTRIES = 50000
+
+# 跨群查重时间窗口（小时）
+CROSS_GROUP_WINDOW = 1
+
+# 参与跨群查重的最短文本长度
+CROSS_GROUP_MIN_LENGTH = 10
+
+# 跨群查重索引最大记录数
+CROSS_GROUP_INDEX_MAX_ENTRIES = 200000
+
+# 图片感知哈希判定为相同图片的最大汉明距离
+IMAGE_HASH_MAX_DISTANCE = 6
+
+# 计算图片感知哈希的进程数
+IMAGE_HASH_WORKERS = 2
+
+# 图片感知哈希缓存的最大条数
+IMAGE_HASH_CACHE_SIZE = 10000
+
+# 转发消息解析结果缓存的最大条数
+FORWARD_CACHE_SIZE = 2000
+
+# 转发消息解析结果缓存的有效期（秒）
+FORWARD_CACHE_TTL = 600
+
+# 单条转发消息最多解析的节点数（含嵌套转发）
+FORWARD_MAX_NODES = 500
+
+# 单条转发消息最多解析的文本字节数
+FORWARD_MAX_BYTES = 256 * 1024
+
+# 嵌套转发的最大展开层数
+FORWARD_MAX_DEPTH = 3
+
+# 同时获取嵌套转发的最大请求数
+FORWARD_FETCH_CONCURRENCY = 4
+
+# LLM 判定缓存的内存最大条数
+LLM_VERDICT_CACHE_SIZE = 5000
+
+# LLM 判定缓存的有效期（小时）
+LLM_VERDICT_CACHE_TTL = 168
+
+# LLM 批量判定每批最多的消息数
+LLM_BATCH_SIZE = 8
+
+# LLM 批量判定收集请求的最长等待时间（毫秒）
+LLM_BATCH_WAIT_MS = 300
+
+# 同时进行的 LLM 调用数量上限
+LLM_MAX_CONCURRENCY = 4
+
+# 排队等待 LLM 调用的请求数量上限，超出时直接放行消息
+LLM_MAX_PENDING = 64
+
+# 单次 LLM 调用超时时间（秒）
+LLM_TIMEOUT = 15
+
+# LLM 连续失败多少次后熔断
+LLM_BREAKER_THRESHOLD = 5
+
+# LLM 熔断后的冷却时间（秒），冷却结束后放行一次试探调用
+LLM_BREAKER_COOLDOWN = 60
+
+# 本地分类器直接给出判定所需的置信度，低于该值的消息交给 LLM
+LOCAL_CLASSIFIER_CONFIDENCE = 0.95
+
+# 训练本地分类器至少需要的 LLM 判定样本数
+LOCAL_CLASSIFIER_MIN_SAMPLES = 200
+
+# 训练本地分类器最多使用的最近样本数
+LOCAL_CLASSIFIER_MAX_SAMPLES = 20000
+
+# 每新增多少条 LLM 判定后重新训练本地分类器
+LOCAL_CLASSIFIER_RETRAIN_INTERVAL = 500
+
+# 转发文案占比达到该值的用户视为可信
+TRUST_THRESHOLD = 0.95
+
+# 用户至少有多少次判定后才计算信誉
+TRUST_MIN_OBSERVATIONS = 30
+
+# 可信用户的消息仍按该比例抽查
+TRUST_SAMPLE_RATE = 0.1
+
+# 单个用户的判定计数上限，超出后计数减半
+TRUST_MAX_OBSERVATIONS = 1000
+
+# 判定为纯聊天时，转发文案计数缩减的倍数
+TRUST_CHAT_PENALTY = 4
+
+# 用户信誉写入数据库的间隔（秒）
+TRUST_FLUSH_INTERVAL = 300
+
+# 转发消息广告关键词
+AD_KEYWORDS = [
+    "推荐群聊",
+    "群聊推荐",
+    "进群",
+    "加群",
+    "群号",
+    "QQ群",
+    "微信群",
+    "telegram",
+    "tg群",
+    "扫码进群",
+    "点击进群",
+    "群二维码",
+]
+
+# 群名片等卡片消息中的广告特征
+AD_CARD_INDICATORS = [
+    "com.tencent.troopsharecard",
+    "推荐群聊",
+    "contact",
+    "jumpUrl",
+    "qm.qq.com",
+    "group_code",
+]
+
 # 默认禁言时长（秒）
 DEFAULT_BAN_DURATION = 600  # 10分钟
@@ -0,0 +1,48 @@
+"""内容指纹模块"""
+
+import hashlib
+from typing import Iterable, Union
+
+# 指纹长度（字节）
+FINGERPRINT_SIZE = 16
+
+
+def compute_fingerprint(data: Union[str, bytes]) -> bytes:
+    """计算内容的 128 位指纹（SHA-256 截断），跨进程、跨重启稳定"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).digest()[:FINGERPRINT_SIZE]
+
+
+class StreamingFingerprint:
+    """增量指纹
+
+    各部分依次写入同一个哈希对象，结果等价于对 prefix 加上以 separator
+    拼接的全部内容调用 compute_fingerprint，但无需构造拼接后的大字符串。
+    """
+
+    def __init__(self, prefix: str = "", separator: str = ""):
+        self._hasher = hashlib.sha256(prefix.encode("utf-8"))
+        self._separator = separator.encode("utf-8")
+        self.count = 0
+
+    def update(self, part: Union[str, bytes]) -> None:
+        """写入一个部分"""
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        if self.count and self._separator:
+            self._hasher.update(self._separator)
+        self._hasher.update(part)
+        self.count += 1
+
+    def digest(self) -> bytes:
+        """获取当前指纹"""
+        return self._hasher.digest()[:FINGERPRINT_SIZE]
+
+
+def combine_fingerprints(fingerprints: Iterable[bytes]) -> bytes:
+    """与顺序无关地合并多个指纹（按 128 位整数求和），只有一个指纹时结果不变"""
+    total = 0
+    for fingerprint in fingerprints:
+        total += int.from_bytes(fingerprint, "big")
+    return (total % (1 << (FINGERPRINT_SIZE * 8))).to_bytes(FINGERPRINT_SIZE, "big")
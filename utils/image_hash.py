@@ -0,0 +1,37 @@
+"""图片感知哈希模块"""
+
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError:
+    # Pillow 为可选依赖，未安装时不计算感知哈希
+    Image = None
+
+
+def compute_dhash(path: str, hash_size: int = 8) -> Optional[int]:
+    """
+    计算图片的 dHash 感知哈希
+
+    缩放为 (hash_size + 1) x hash_size 的灰度图，比较每行相邻像素的亮度得到
+    hash_size * hash_size 位签名。重新压缩、缩放或转存的图片签名基本不变。
+    在进程池中执行，因此必须是模块级函数。
+    """
+    if Image is None:
+        return None
+    with Image.open(path) as image:
+        # JPEG 可直接按缩小的尺寸解码，避免解码整张大图
+        image.draft("L", ((hash_size + 1) * 4, hash_size * 4))
+        pixels = list(
+            image.convert("L")
+            .resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR)
+            .getdata()
+        )
+
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
@@ -0,0 +1,92 @@
+"""多关键词匹配模块"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+# 关键词不超过该数量时使用正则交替匹配，否则使用 Aho-Corasick 自动机。
+# 关键词较少时正则引擎逐字符扫描更快，关键词增多后其耗时随数量线性增长，
+# 而自动机的扫描耗时与关键词数量无关。
+REGEX_PATTERN_LIMIT = 100
+
+
+class AhoCorasick:
+    """Aho-Corasick 自动机，一次扫描即可找出任意关键词"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Optional[str]] = [None]
+
+        for pattern in patterns:
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                    self._goto[state][char] = next_state
+                state = next_state
+            if self._output[state] is None:
+                self._output[state] = pattern
+
+        # 按层构建失败指针，并继承后缀状态的输出
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Optional[str]:
+        """返回最先结束匹配的关键词，没有匹配时返回 None"""
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] is not None:
+                return output[state]
+        return None
+
+
+class KeywordMatcher:
+    """不区分大小写的多关键词匹配器，构建一次后可重复使用"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(
+            dict.fromkeys(str(k).strip().lower() for k in keywords if str(k).strip())
+        )
+        self._automaton = None
+        self._pattern = None
+        if len(self.keywords) > REGEX_PATTERN_LIMIT:
+            self._automaton = AhoCorasick(self.keywords)
+        elif self.keywords:
+            # 长关键词优先，与自动机一样报告完整的关键词
+            self._pattern = re.compile(
+                "|".join(
+                    re.escape(k) for k in sorted(self.keywords, key=len, reverse=True)
+                )
+            )
+
+    def search(self, text: str) -> Optional[str]:
+        """返回文本中命中的关键词，没有命中时返回 None"""
+        if not text:
+            return None
+        text = text.lower()
+        if self._automaton is not None:
+            return self._automaton.search(text)
+        if self._pattern is not None:
+            match = self._pattern.search(text)
+            return match.group(0) if match else None
+        return None
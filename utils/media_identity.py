@@ -0,0 +1,72 @@
+"""媒体标识规范化模块"""
+
+import re
+from functools import lru_cache
+from typing import List, Pattern, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# 按平台预编译的规则，按顺序匹配，第一个分组为稳定的内容标识
+MEDIA_ID_RULES: List[Tuple[str, Pattern[str]]] = [
+    # QQ 群图片 CDN：https://gchat.qpic.cn/gchatpic_new/0/0-0-<MD5>/0?term=2
+    (
+        "md5",
+        re.compile(r"^https?://[^/]*qpic\.cn/[^?#]*?-([0-9a-fA-F]{32})/", re.I),
+    ),
+    # NapCat / OneBot 文件名：<MD5>.jpg、{MD5}.image 等
+    (
+        "md5",
+        re.compile(r"^(?:.*[/\\])?\{?([0-9a-fA-F]{32})\}?(?:\.[0-9a-zA-Z]+)?$"),
+    ),
+    # QQ NT 多媒体下载地址，rkey 等参数每次下发都会变化，只保留 fileid
+    (
+        "fileid",
+        re.compile(
+            r"^https?://multimedia\.nt\.qq\.com\.cn/[^?#]*\?(?:.*&)?fileid=([^&#]+)",
+            re.I,
+        ),
+    ),
+]
+
+# 每次下发都会变化、不标识内容的查询参数
+VOLATILE_QUERY_PARAMS = frozenset(
+    {"rkey", "term", "is_origin", "expires", "sign", "signature", "token"}
+)
+
+_HTTP_PATTERN = re.compile(r"^https?://", re.I)
+_NT_PATTERN = re.compile(r"^https?://multimedia\.nt\.qq\.com\.cn/", re.I)
+
+
+def _normalize_url(value: str) -> str:
+    """去掉协议、锚点和易变的查询参数，保留主机、路径和其余参数"""
+    parts = urlsplit(value)
+    query = urlencode(
+        [
+            (key, val)
+            for key, val in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in VOLATILE_QUERY_PARAMS
+        ]
+    )
+    return f"url:{parts.netloc.lower()}{parts.path}" + (f"?{query}" if query else "")
+
+
+@lru_cache(maxsize=4096)
+def normalize_media_id(value: str) -> str:
+    """
+    提取媒体文件的稳定标识
+
+    同一内容经过不同 CDN 或携带不同签名参数时得到相同的标识；
+    其他网址只去掉易变的签名参数，无法识别的值原样返回。
+    结果会被缓存，同一原始值只解析一次。
+    """
+    value = value.strip()
+    for kind, pattern in MEDIA_ID_RULES:
+        match = pattern.match(value)
+        if match:
+            content_id = match.group(1)
+            if kind == "md5":
+                content_id = content_id.lower()
+            return f"{kind}:{content_id}"
+    # QQ NT 地址缺少 fileid 时无法确定内容，原样返回
+    if _HTTP_PATTERN.match(value) and not _NT_PATTERN.match(value):
+        return _normalize_url(value)
+    return value
@@ -1,7 +1,12 @@
 """群管理规则配置模块"""
 
-from typing import Tuple
-from .constants import BAN_DURATIONS, MESSAGE_TYPE_NAMES, DEFAULT_BAN_DURATION
+from typing import Dict, List, Tuple
+from .constants import (
+    BAN_DURATIONS,
+    MESSAGE_TYPE_NAMES,
+    DEFAULT_BAN_DURATION,
+    DUPLICATE_CHECK_WINDOW,
+)
 
 
 class AdminRules:
@@ -13,11 +18,49 @@ class AdminRules:
         return BAN_DURATIONS.get(message_type, DEFAULT_BAN_DURATION)
 
     @staticmethod
-    def get_warning_message(message_type: str) -> str:
+    def get_warning_message(
+        message_type: str, window_hours: int = DUPLICATE_CHECK_WINDOW
+    ) -> str:
         """获取警告消息"""
         type_name = MESSAGE_TYPE_NAMES.get(message_type, "内容")
         duration_minutes = AdminRules.get_ban_duration(message_type) // 60
-        return f"⚠️ 检测到重复发送24小时内的{type_name}，已禁言{duration_minutes}分钟。此消息将在1分钟后撤回。"
+        if window_hours <= 24:
+            window_desc = f"{window_hours}小时"
+        else:
+            window_desc = AdminRules.format_duration(window_hours * 3600)
+        return f"⚠️ 检测到重复发送{window_desc}内的{type_name}，已禁言{duration_minutes}分钟。此消息将在1分钟后撤回。"
+
+    @staticmethod
+    def get_repost_warning_message(
+        message_type: str, first_user_id: int, elapsed_seconds: int
+    ) -> str:
+        """获取重复搬运他人内容的警告消息"""
+        type_name = MESSAGE_TYPE_NAMES.get(message_type, "内容")
+        duration_minutes = AdminRules.get_ban_duration(message_type) // 60
+        elapsed = AdminRules.format_duration(max(0, int(elapsed_seconds)))
+        return f"⚠️ 该{type_name}已由 {first_user_id} 在{elapsed}前发过，请勿重复搬运，已禁言{duration_minutes}分钟。此消息将在1分钟后撤回。"
+
+    @staticmethod
+    def get_cross_group_warning_message(message_type: str) -> str:
+        """获取跨群重复发送的警告消息"""
+        type_name = MESSAGE_TYPE_NAMES.get(message_type, "内容")
+        duration_minutes = AdminRules.get_ban_duration(message_type) // 60
+        return f"⚠️ 该{type_name}刚在其他群发送过，疑似跨群刷屏，已禁言{duration_minutes}分钟。此消息将在1分钟后撤回。"
+
+    @staticmethod
+    def parse_type_windows(items: List[str]) -> Dict[str, int]:
+        """解析按消息类型配置的查重窗口，格式为 类型:小时"""
+        windows = {}
+        for item in items or []:
+            try:
+                message_type, hours = str(item).split(":", 1)
+                hours = int(hours)
+            except ValueError:
+                raise ValueError(f"无效的查重窗口配置: {item}")
+            if hours <= 0:
+                raise ValueError(f"查重窗口必须大于0小时: {item}")
+            windows[message_type.strip().lower()] = hours
+        return windows
 
     @staticmethod
     def normalize_time_string(time_str: str) -> str:
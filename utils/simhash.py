@@ -0,0 +1,112 @@
+"""SimHash 近似重复检测模块"""
+
+from typing import Optional
+
+# 签名位数
+SIMHASH_BITS = 64
+
+_MASK64 = (1 << 64) - 1
+
+# 字符码位上限，用于把 n-gram 编码为一个整数
+_CODEPOINT_LIMIT = 0x110000
+
+# 每个计数器占用的位数，用于在一个大整数中并行累加 64 个计数器
+_COUNTER_BITS = 16
+
+# 计数器不溢出时允许的最大特征数
+_MAX_SHINGLES = (1 << _COUNTER_BITS) - 1
+
+# 按字节位置预先展开的查找表：第 i 个字节的每一位对应第 8i 到 8i+7 个计数器
+_SPREAD_TABLES = [
+    [
+        sum(
+            1 << ((index * 8 + bit) * _COUNTER_BITS)
+            for bit in range(8)
+            if value >> bit & 1
+        )
+        for value in range(256)
+    ]
+    for index in range(SIMHASH_BITS // 8)
+]
+
+
+def _mix64(value: int) -> int:
+    """splitmix64 混淆函数，把 n-gram 编码打散为均匀分布的 64 位哈希"""
+    value = (value + 0x9E3779B97F4A7C15) & _MASK64
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return value ^ (value >> 31)
+
+
+def _spread(value: int) -> int:
+    """把 64 位哈希的每一位展开到对应的计数器上"""
+    t0, t1, t2, t3, t4, t5, t6, t7 = _SPREAD_TABLES
+    b0, b1, b2, b3, b4, b5, b6, b7 = value.to_bytes(8, "little")
+    return (
+        t0[b0] + t1[b1] + t2[b2] + t3[b3] + t4[b4] + t5[b5] + t6[b6] + t7[b7]
+    )
+
+
+class SimHashBuilder:
+    """增量 SimHash 构建器
+
+    按字符流写入文本，只保留字母、数字和汉字并转为小写，以字符 n-gram
+    作为特征。增删空格、标点或表情不会改变特征，少量改动只影响少数特征。
+    """
+
+    def __init__(self, shingle_size: int = 3, max_shingles: int = 4096):
+        self.shingle_size = max(1, shingle_size)
+        self.max_shingles = min(max_shingles, _MAX_SHINGLES)
+        self.count = 0
+        self.length = 0
+        self._key = 0
+        self._key_modulus = _CODEPOINT_LIMIT**self.shingle_size
+        self._total = 0
+
+    def update(self, text: str) -> None:
+        """写入一段文本"""
+        size = self.shingle_size
+        key = self._key
+        modulus = self._key_modulus
+        length = self.length
+        count = self.count
+        total = self._total
+        for char in text.lower():
+            if count >= self.max_shingles:
+                break
+            if not char.isalnum():
+                continue
+            # 滚动编码最近 shingle_size 个字符
+            key = (key * _CODEPOINT_LIMIT + ord(char)) % modulus
+            length += 1
+            if length >= size:
+                total += _spread(_mix64(key))
+                count += 1
+        self._key = key
+        self.length = length
+        self.count = count
+        self._total = total
+
+    def digest(self) -> Optional[int]:
+        """获取 64 位签名，没有任何特征时返回 None"""
+        if not self.count:
+            return None
+        mask = (1 << _COUNTER_BITS) - 1
+        total = self._total
+        signature = 0
+        for bit in range(SIMHASH_BITS):
+            if ((total >> (bit * _COUNTER_BITS)) & mask) * 2 > self.count:
+                signature |= 1 << bit
+        return signature
+
+
+def simhash(text: str, shingle_size: int = 3) -> Optional[int]:
+    """计算文本的 64 位 SimHash 签名"""
+    builder = SimHashBuilder(shingle_size)
+    builder.update(text)
+    return builder.digest()
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """计算两个签名的汉明距离"""
+    return (a ^ b).bit_count()
@@ -0,0 +1,192 @@
+"""本地文本分类模块
+
+用字符 n-gram 朴素贝叶斯模型判断消息是否为转发文案，训练数据来自 LLM 的历史判定。
+模型只在置信度足够高时给出结论，其余消息仍交给 LLM 判断。
+"""
+
+import hashlib
+import json
+import math
+import unicodedata
+from collections import Counter
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+
+# 模型文件格式版本
+MODEL_VERSION = 1
+
+# 对数几率的截断范围，避免 exp 溢出
+_MAX_LOGIT = 30.0
+
+
+def extract_features(text: str, max_ngram: int = 3) -> Set[str]:
+    """
+    提取消息特征：1 到 max_ngram 字符的 n-gram 和长度区间
+
+    同一特征在一条消息中只计一次，短消息与长文案的差异由长度区间体现。
+    """
+    text = " ".join(unicodedata.normalize("NFKC", text).lower().split())
+    features = {f"#len:{min(len(text) // 20, 10)}"}
+    for n in range(1, max_ngram + 1):
+        for start in range(len(text) - n + 1):
+            features.add(text[start : start + n])
+    return features
+
+
+class NaiveBayesClassifier:
+    """字符 n-gram 朴素贝叶斯分类器，输出消息为转发文案的概率"""
+
+    def __init__(
+        self,
+        max_ngram: int = 3,
+        alpha: float = 1.0,
+        min_count: int = 2,
+        max_features: int = 50000,
+    ):
+        self.max_ngram = max_ngram
+        self.alpha = alpha
+        self.min_count = min_count
+        self.max_features = max_features
+        self.sample_count = 0
+        # 先验对数几率和每个特征的对数似然比
+        self._prior = 0.0
+        self._weights: dict = {}
+
+    @property
+    def trained(self) -> bool:
+        return bool(self._weights)
+
+    def train(self, samples: Iterable[Tuple[str, bool]]) -> None:
+        """用 (文本, 是否为转发文案) 样本重新训练模型"""
+        counts = (Counter(), Counter())
+        docs = [0, 0]
+        for text, label in samples:
+            label = int(bool(label))
+            docs[label] += 1
+            counts[label].update(extract_features(text, self.max_ngram))
+
+        self.sample_count = docs[0] + docs[1]
+        if not docs[0] or not docs[1]:
+            # 只有一类样本时无法区分
+            self._prior = 0.0
+            self._weights = {}
+            return
+
+        total = counts[0] + counts[1]
+        vocab = [
+            feature
+            for feature, count in total.most_common(self.max_features)
+            if count >= self.min_count
+        ]
+        # 伯努利模型：特征出现的概率按文档数平滑
+        self._prior = math.log(docs[1] / docs[0])
+        self._weights = {
+            feature: math.log(
+                (counts[1][feature] + self.alpha) / (docs[1] + 2 * self.alpha)
+            )
+            - math.log((counts[0][feature] + self.alpha) / (docs[0] + 2 * self.alpha))
+            for feature in vocab
+        }
+
+    def predict_proba(self, text: str) -> Optional[float]:
+        """返回消息为转发文案的概率，模型未训练时返回 None"""
+        if not self._weights:
+            return None
+        weights = self._weights
+        logit = self._prior
+        for feature in extract_features(text, self.max_ngram):
+            weight = weights.get(feature)
+            if weight is not None:
+                logit += weight
+        logit = max(-_MAX_LOGIT, min(_MAX_LOGIT, logit))
+        return 1.0 / (1.0 + math.exp(-logit))
+
+    def predict(self, text: str, confidence: float) -> Optional[bool]:
+        """概率达到置信度时给出判定，否则返回 None"""
+        proba = self.predict_proba(text)
+        if proba is None:
+            return None
+        if proba >= confidence:
+            return True
+        if proba <= 1.0 - confidence:
+            return False
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MODEL_VERSION,
+            "max_ngram": self.max_ngram,
+            "alpha": self.alpha,
+            "sample_count": self.sample_count,
+            "prior": self._prior,
+            "weights": self._weights,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesClassifier":
+        if data.get("version") != MODEL_VERSION:
+            raise ValueError(f"不支持的模型版本: {data.get('version')}")
+        classifier = cls(max_ngram=data["max_ngram"], alpha=data["alpha"])
+        classifier.sample_count = data["sample_count"]
+        classifier._prior = data["prior"]
+        classifier._weights = data["weights"]
+        return classifier
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesClassifier":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def evaluate(
+    classifier: NaiveBayesClassifier,
+    samples: Sequence[Tuple[str, bool]],
+    confidence: float,
+) -> dict:
+    """
+    评估模型与 LLM 判定的一致程度
+
+    Returns:
+        dict: covered 为模型给出结论（可省去 LLM 调用）的比例，
+              agreement 为这些结论与 LLM 一致的比例
+    """
+    covered = agreed = 0
+    false_forward = false_chat = 0
+    for text, label in samples:
+        verdict = classifier.predict(text, confidence)
+        if verdict is None:
+            continue
+        covered += 1
+        if verdict == bool(label):
+            agreed += 1
+        elif verdict:
+            false_forward += 1
+        else:
+            false_chat += 1
+
+    total = len(samples)
+    return {
+        "samples": total,
+        "covered": round(covered / total if total else 0.0, 4),
+        "agreement": round(agreed / covered if covered else 0.0, 4),
+        "calls_avoided": covered,
+        "false_forward": false_forward,
+        "false_chat": false_chat,
+    }
+
+
+def split_samples(
+    samples: List[Tuple[str, bool]], test_ratio: float
+) -> Tuple[List[Tuple[str, bool]], List[Tuple[str, bool]]]:
+    """按文本哈希稳定地划分训练集和测试集，相同文本总落在同一侧"""
+    train, test = [], []
+    for sample in samples:
+        digest = hashlib.blake2b(sample[0].encode("utf-8"), digest_size=4).digest()
+        if int.from_bytes(digest, "big") % 1000 < test_ratio * 1000:
+            test.append(sample)
+        else:
+            train.append(sample)
+    return train, test